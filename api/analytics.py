@@ -0,0 +1,265 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent.parent / "pipeline"))
+from config import get_minio_client, BUCKET_GOLD
+from storage import fetch_object, stream_parts
+
+FACT_OBJECT = "fact_achats.parquet"
+DIM_PAYS_OBJECT = "dim_pays.parquet"
+ANALYTICS_CHECK_SECONDS = float(os.getenv("ANALYTICS_CHECK_SECONDS", 30))
+ANALYTICS_CACHE_ENTRIES = int(os.getenv("ANALYTICS_CACHE_ENTRIES", 256))
+ANALYTICS_MAX_ROWS = int(os.getenv("ANALYTICS_MAX_ROWS", 10000))
+
+FACT_COLUMNS = ["produit", "categorie", "quantite", "montant_total", "date_achat",
+                "statut", "mode_paiement", "pays_id"]
+DIMENSIONS = ["pays", "region", "categorie", "produit", "statut", "mode_paiement", "annee", "trimestre", "mois"]
+FILTERS = ["pays", "region", "categorie", "produit", "statut", "mode_paiement"]
+MEASURES = ["montant_total", "quantite"]
+# API name -> pyarrow hash aggregate
+AGGREGATIONS = {"sum": "sum", "avg": "mean", "min": "min", "max": "max"}
+
+_state = {"etag": None, "table": None, "sorted": False, "checked_at": 0.0}
+_results = OrderedDict()
+_lock = threading.Lock()
+
+
+def _dictionary(column) -> pa.DictionaryArray:
+    return pc.dictionary_encode(column.combine_chunks() if isinstance(column, pa.ChunkedArray) else column)
+
+
+def _period(codes: np.ndarray, valid: np.ndarray, label) -> pa.DictionaryArray:
+    """Dictionary column from integer period codes (year * 12 + month...), labelling each code once.
+
+    Rows where ``valid`` is False (no date) are null and do not widen the range of labels.
+    """
+    first = int(codes[valid].min()) if valid.any() else 0
+    last = int(codes[valid].max()) if valid.any() else -1
+    dictionary = pa.array([label(code) for code in range(first, last + 1)], pa.string())
+    return pa.DictionaryArray.from_arrays(pa.array(codes - first, pa.int32(), mask=~valid), dictionary)
+
+
+def _lookup(keys: np.ndarray, dim_keys: np.ndarray, values: pa.Array) -> pa.DictionaryArray:
+    """Dimension attribute per row as a dictionary column (unknown keys are null)."""
+    positions = pc.index_in(pa.array(keys), value_set=pa.array(dim_keys))
+    return pa.DictionaryArray.from_arrays(pc.cast(positions, pa.int32()), values)
+
+
+def prepare_table(fact: pa.Table, dim_pays: pa.Table) -> pa.Table:
+    """Columns used by the queries: dictionary-encoded dimensions, date32 dates and derived periods."""
+    dates = pc.cast(pc.cast(pc.utf8_slice_codeunits(fact["date_achat"], 0, 10), pa.timestamp("s")), pa.date32())
+    # Silver coerces unparsable dates to null: keep those rows, with null periods
+    valid = pc.is_valid(dates).to_numpy(zero_copy_only=False)
+    years = pc.year(dates).fill_null(0).to_numpy().astype(np.int32)
+    months = pc.month(dates).fill_null(1).to_numpy().astype(np.int32)
+    pays_ids = fact["pays_id"].to_numpy()
+    dim_ids = dim_pays["pays_id"].to_numpy()
+
+    columns = {
+        "date": dates.combine_chunks(),
+        "annee": pa.array(years.astype(np.int16), mask=~valid),
+        "trimestre": _period(years * 4 + (months - 1) // 3, valid, lambda code: f"{code // 4}-Q{code % 4 + 1}"),
+        "mois": _period(years * 12 + months - 1, valid, lambda code: f"{code // 12}-{code % 12 + 1:02d}"),
+        "pays": _lookup(pays_ids, dim_ids, dim_pays["pays"].combine_chunks().cast(pa.string())),
+        "region": _lookup(pays_ids, dim_ids, dim_pays["region"].combine_chunks().cast(pa.string())),
+    }
+    for name in ["produit", "categorie", "statut", "mode_paiement"]:
+        columns[name] = _dictionary(fact[name].cast(pa.string()))
+    for name in MEASURES:
+        columns[name] = fact[name].combine_chunks()
+    return pa.table(columns)
+
+
+def _is_sorted(dates: pa.ChunkedArray) -> bool:
+    values = dates.to_numpy()
+    return bool(np.all(values[1:] >= values[:-1]))
+
+
+def load_gold(etag: str) -> None:
+    """Load fact_achats (+ dim_pays for the country names) into memory as one Arrow table."""
+    started = time.perf_counter()
+    names = [FACT_OBJECT] + [obj.object_name for obj in stream_parts(BUCKET_GOLD, FACT_OBJECT)]
+    # Parts may type a column differently (e.g. pays_id without nulls is int64)
+    fact = pa.concat_tables([pq.read_table(fetch_object(BUCKET_GOLD, name), columns=FACT_COLUMNS) for name in names],
+                            promote_options="permissive")
+    dim_pays = pq.read_table(fetch_object(BUCKET_GOLD, DIM_PAYS_OBJECT), columns=["pays_id", "pays", "region"])
+    table = prepare_table(fact, dim_pays)
+    _state.update(etag=etag, table=table, sorted=_is_sorted(table["date"]))
+    _results.clear()
+    print(f"📊 Analytics: {table.num_rows} achats chargés en mémoire ({table.nbytes / 1024 ** 2:.1f} Mo) "
+          f"en {time.perf_counter() - started:.2f}s")
+
+
+def gold_table() -> tuple[str, pa.Table, bool]:
+    """Current gold generation (ETag of fact_achats.parquet) and its table, reloaded when it changed.
+
+    Stream parts are only appended until the table is rewritten, so the last one completes the generation.
+    """
+    with _lock:
+        if _state["table"] is None or time.monotonic() - _state["checked_at"] >= ANALYTICS_CHECK_SECONDS:
+            try:
+                client = get_minio_client()
+                etag = client.stat_object(BUCKET_GOLD, FACT_OBJECT).etag.strip('"')
+                parts = stream_parts(BUCKET_GOLD, FACT_OBJECT, client)
+                if parts:
+                    etag += "+" + Path(parts[-1].object_name).stem
+            except Exception:
+                if _state["table"] is None:
+                    raise
+                # MinIO unreachable: keep serving the table already loaded
+                etag = _state["etag"]
+            if etag != _state["etag"]:
+                load_gold(etag)
+            _state["checked_at"] = time.monotonic()
+        return _state["etag"], _state["table"], _state["sorted"]
+
+
+def _split(value: str | None) -> list[str]:
+    return [part.strip() for part in value.split(",") if part.strip()] if value else []
+
+
+def parse_metric(metric: str) -> tuple[str, str | None]:
+    if metric == "count":
+        return "count", None
+    op, _, field = metric.partition(":")
+    if op not in AGGREGATIONS or field not in MEASURES:
+        raise ValueError(f"Invalid metric: {metric} (expected count or sum|avg|min|max:{'|'.join(MEASURES)})")
+    return op, field
+
+
+def parse_query(args) -> tuple:
+    """Normalized, hashable form of an analytics query (also the result cache key)."""
+    group_by = tuple(_split(args.get("group_by")))
+    unknown = [key for key in group_by if key not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Invalid group_by: {unknown} (expected {DIMENSIONS})")
+
+    metrics = tuple(dict.fromkeys(_split(args.get("metrics")) or ["sum:montant_total", "count"]))
+    for metric in metrics:
+        parse_metric(metric)
+
+    dates = []
+    for name in ("date_from", "date_to"):
+        value = args.get(name)
+        if value:
+            try:
+                value = np.datetime64(value, "D")
+            except ValueError:
+                raise ValueError(f"Invalid {name}: {value} (expected YYYY-MM-DD)")
+        dates.append(value)
+
+    filters = tuple((name, tuple(sorted(_split(args.get(name))))) for name in FILTERS if args.get(name))
+    sort = args.get("sort", f"-{metrics[0].replace(':', '_')}")
+    limit = min(int(args.get("limit", 1000)), ANALYTICS_MAX_ROWS)
+    return group_by, metrics, dates[0], dates[1], filters, sort, limit
+
+
+def _date_range(table: pa.Table, is_sorted: bool, date_from, date_to) -> pa.Table:
+    if date_from is None and date_to is None:
+        return table
+    if is_sorted:
+        # fact_achats is written sorted by date: slice instead of scanning
+        days = table["date"].to_numpy()
+        start = np.searchsorted(days, date_from, "left") if date_from is not None else 0
+        end = np.searchsorted(days, date_to, "right") if date_to is not None else len(days)
+        return table.slice(start, max(end - start, 0))
+    mask = None
+    if date_from is not None:
+        mask = pc.greater_equal(table["date"], pa.scalar(date_from.item(), pa.date32()))
+    if date_to is not None:
+        upper = pc.less_equal(table["date"], pa.scalar(date_to.item(), pa.date32()))
+        mask = upper if mask is None else pc.and_(mask, upper)
+    return table.filter(mask)
+
+
+def execute(table: pa.Table, is_sorted: bool, query: tuple) -> list[dict]:
+    group_by, metrics, date_from, date_to, filters, sort, limit = query
+    table = _date_range(table, is_sorted, date_from, date_to)
+
+    measures = [field for field in (parse_metric(metric)[1] for metric in metrics) if field]
+    table = table.select(list(dict.fromkeys([*group_by, *measures, *(name for name, _ in filters)])))
+
+    mask = None
+    for name, values in filters:
+        # Compare dictionary codes: one small lookup instead of decoding every string
+        column = table[name].combine_chunks()
+        codes = [code for code, value in enumerate(column.dictionary.to_pylist()) if value in values]
+        if len(codes) == 1:
+            condition = pc.equal(column.indices, pa.scalar(codes[0], column.indices.type))
+        else:
+            keep = np.zeros(len(column.dictionary), dtype=bool)
+            keep[codes] = True
+            condition = pa.array(keep[pc.fill_null(column.indices, 0).to_numpy()])
+            if column.null_count:
+                condition = pc.and_(condition, column.is_valid())
+        mask = condition if mask is None else pc.and_(mask, condition)
+    if mask is not None:
+        table = table.filter(mask)
+
+    aggregations, names = [], []
+    for metric in metrics:
+        op, field = parse_metric(metric)
+        aggregations.append(([], "count_all") if op == "count" else (field, AGGREGATIONS[op]))
+        names.append("count" if op == "count" else f"{op}_{field}")
+    result = table.group_by(list(group_by)).aggregate(aggregations)
+    # pyarrow names the aggregate columns field_function
+    columns = [f"{field}_{function}" if field else "count_all" for field, function in aggregations]
+    result = result.select(list(group_by) + columns).rename_columns(list(group_by) + names)
+
+    for name in group_by:
+        field_type = result.schema.field(name).type
+        if pa.types.is_dictionary(field_type):
+            # Only a few groups are left: plain strings can be sorted
+            result = result.set_column(result.schema.get_field_index(name), name,
+                                       pc.cast(result[name], field_type.value_type))
+
+    sort_key = sort.lstrip("-")
+    if sort_key not in result.column_names:
+        raise ValueError(f"Invalid sort: {sort} (expected one of {result.column_names}, '-' for descending)")
+    result = result.sort_by([(sort_key, "descending" if sort.startswith("-") else "ascending")])
+    return [
+        {name: round(value, 2) if isinstance(value, float) else value for name, value in row.items()}
+        for row in result.slice(0, limit).to_pylist()
+    ]
+
+
+def run_query(args) -> dict:
+    """Answer an /api/analytics query, from the result cache when the gold generation is unchanged."""
+    query = parse_query(args)
+    started = time.perf_counter()
+    generation, table, is_sorted = gold_table()
+
+    key = (generation, query)
+    with _lock:
+        rows = _results.get(key)
+        if rows is not None:
+            _results.move_to_end(key)
+    cached = rows is not None
+    if not cached:
+        rows = execute(table, is_sorted, query)
+        with _lock:
+            if generation == _state["etag"]:
+                _results[key] = rows
+                while len(_results) > ANALYTICS_CACHE_ENTRIES:
+                    _results.popitem(last=False)
+
+    group_by, metrics = query[0], query[1]
+    return {
+        "generation": generation,
+        "group_by": list(group_by),
+        "metrics": list(metrics),
+        "rows": len(rows),
+        "data": rows,
+        "cached": cached,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
@@ -1,208 +1,842 @@
 import sys
 from pathlib import Path
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, g, jsonify, request, send_from_directory, stream_with_context
 from flask_cors import CORS
 from datetime import datetime, timedelta
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from urllib.parse import urlsplit
+from werkzeug.exceptions import HTTPException
+from bson import ObjectId
+import base64
+import hashlib
+import json
+import threading
+import time
 import os
 
 sys.path.append(str(Path(__file__).parent.parent))
 from config import (
-    get_mongodb_client, get_mongodb_database,
-    COLLECTION_CLIENTS, COLLECTION_ACHATS, COLLECTION_KPI, COLLECTION_SYNC_LOG
+    LazyDatabase, MONGODB_DATABASE,
+    COLLECTION_CLIENTS, COLLECTION_ACHATS, COLLECTION_KPI, COLLECTION_SYNC_LOG,
+    COLLECTION_CLIENT_SUMMARY, COLLECTION_ACHATS_BUCKETS, COLLECTION_CLIENT_SEARCH, HASH_FIELD, GOLD_AGGREGATES,
+    stored_field, stored_value, api_value, encode_query, decode_document, decode_stages,
+    query_tokens, search_filters, rank_matches
 )
+import analytics
+import export
+import metrics
+import serialize
+import timeseries
 
 app = Flask(__name__, static_folder='dashboard', static_url_path='')
 CORS(app)
+app.json = serialize.FastJSONProvider(app)
 
-# MongoDB connection
-try:
-    mongodb_client = get_mongodb_client()
-    db = get_mongodb_database(mongodb_client)
-except Exception as e:
-    print(f"Error connecting to MongoDB: {e}")
-    db = None
+# Command timings need the listener registered before the MongoClient is created
+metrics.register()
+
+# MongoDB connection, opened on first request in each worker process
+db = LazyDatabase()
+
+# Response cache, invalidated whenever a new sync_log entry appears
+API_CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", 512))
+API_CACHE_MAX_BYTES = int(os.getenv("API_CACHE_MAX_BYTES", 64 * 1024 ** 2))
+API_CACHE_CHECK_SECONDS = float(os.getenv("API_CACHE_CHECK_SECONDS", 1))
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_state = {"generation": None, "last_modified": None, "checked_at": 0.0, "bytes": 0}
+
+
+def generation_due():
+    return time.monotonic() - _cache_state["checked_at"] >= API_CACHE_CHECK_SECONDS
+
+
+def update_generation(latest):
+    """Record the latest sync_log entry, clearing the cache when it changed."""
+    generation = str(latest["_id"]) if latest else None
+    with _cache_lock:
+        if generation != _cache_state["generation"]:
+            _cache.clear()
+            _cache_state["bytes"] = 0
+            _cache_state["generation"] = generation
+            _cache_state["last_modified"] = latest.get("timestamp") if latest else None
+        _cache_state["checked_at"] = time.monotonic()
+    return current_generation()
+
+
+def current_generation():
+    return _cache_state["generation"], _cache_state["last_modified"]
+
+
+LATEST_SYNC_QUERY = ({}, {"timestamp": 1})
+LATEST_SYNC_SORT = [("timestamp", -1), ("_id", -1)]
+
+
+def sync_generation():
+    """Return the latest sync_log entry id and timestamp, checked at most once per API_CACHE_CHECK_SECONDS."""
+    if generation_due():
+        return update_generation(db[COLLECTION_SYNC_LOG].find_one(*LATEST_SYNC_QUERY, sort=LATEST_SYNC_SORT))
+    return current_generation()
+
+
+def cache_key(generation, path, args):
+    return generation, path, tuple(sorted(args.multi_items() if hasattr(args, "multi_items") else args.items(multi=True)))
+
+
+def cache_get(key):
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry:
+            _cache.move_to_end(key)
+        return entry
+
+
+def entry_size(entry):
+    return len(entry["body"]) + sum(len(body) for body in entry["encoded"].values())
+
+
+def cache_put(key, body, mimetype):
+    entry = {"body": body, "mimetype": mimetype, "etag": hashlib.md5(body).hexdigest(), "encoded": {}}
+    with _cache_lock:
+        if key[0] == _cache_state["generation"]:
+            previous = _cache.pop(key, None)
+            _cache_state["bytes"] += len(body) - (entry_size(previous) if previous else 0)
+            _cache[key] = entry
+            while len(_cache) > API_CACHE_MAX_ENTRIES or _cache_state["bytes"] > API_CACHE_MAX_BYTES:
+                _, evicted = _cache.popitem(last=False)
+                _cache_state["bytes"] -= entry_size(evicted)
+    return entry
+
+
+def encoded_body(key, entry, encoding):
+    """Body of a cache entry in ``encoding``, compressed once and kept with the entry."""
+    if encoding is None:
+        return entry["body"]
+    body = entry["encoded"].get(encoding)
+    if body is None:
+        body = serialize.compress(entry["body"], encoding)
+        with _cache_lock:
+            if _cache.get(key) is entry and encoding not in entry["encoded"]:
+                _cache_state["bytes"] += len(body)
+            entry["encoded"][encoding] = body
+    return body
+
+
+def entry_etag(entry, encoding):
+    # Each encoding is a different representation, so it needs its own strong ETag
+    return f"{entry['etag']}-{encoding}" if encoding else entry["etag"]
+
+
+def cached_response(view):
+    """Serve a GET view from the LRU response cache, with ETag/Last-Modified and 304 revalidation."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # ?live=true (KPI) is computed from the current data on every request
+        if kpi_requested_live(request.args):
+            return view(*args, **kwargs)
+        try:
+            generation, last_modified = sync_generation()
+        except Exception:
+            return view(*args, **kwargs)
+        key = cache_key(generation, request.path, request.args)
+
+        # A request sent with Cache-Control: no-cache recomputes and refreshes the entry
+        refresh = "no-cache" in request.headers.get("Cache-Control", "")
+        entry = None if refresh else cache_get(key)
+        if entry is None:
+            response, status = view(*args, **kwargs)
+            if status != 200:
+                return response, status
+            entry = cache_put(key, response.get_data(), response.mimetype)
+            cache_status = "MISS"
+        else:
+            cache_status = "HIT"
+
+        encoding = serialize.negotiate_encoding(request.headers.get("Accept-Encoding"), len(entry["body"]))
+        response = app.response_class(encoded_body(key, entry, encoding), status=200, mimetype=entry["mimetype"])
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        response.set_etag(entry_etag(entry, encoding))
+        if isinstance(last_modified, datetime):
+            response.last_modified = last_modified
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["X-Cache"] = cache_status
+        return response.make_conditional(request)
+    return wrapper
+
+
+# Keyset pagination: allowed sort keys per collection, unique ones need no _id tie-breaker
+PAGE_SORT_KEYS = {
+    COLLECTION_CLIENTS: ["client_id"],
+    COLLECTION_ACHATS: ["achat_id", "date_achat", "montant_total"],
+}
+UNIQUE_SORT_KEYS = {"client_id", "achat_id"}
+API_COUNT_CACHE_ENTRIES = int(os.getenv("API_COUNT_CACHE_ENTRIES", 1024))
+API_MAX_IDS = int(os.getenv("API_MAX_IDS", 1000))
+
+_counts = OrderedDict()
+
+
+def encode_cursor(sort_key, value, object_id):
+    data = json.dumps([sort_key, value, str(object_id)]).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        sort_key, value, object_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return sort_key, value, ObjectId(object_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def client_ids(args):
+    """Client ids of a bulk lookup (``ids=1,2,3``), or None."""
+    ids = args.get('ids')
+    if not ids:
+        return None
+    try:
+        ids = sorted({int(i) for i in ids.split(',') if i.strip()})
+    except ValueError:
+        raise ValueError("Invalid ids: expected comma-separated integers")
+    if len(ids) > API_MAX_IDS:
+        raise ValueError(f"Too many ids: {len(ids)} (max {API_MAX_IDS})")
+    return ids
+
+
+def clients_query(args):
+    query = {}
+    pays = args.get('pays')
+    if pays:
+        query['pays'] = pays
+    ids = client_ids(args)
+    if ids:
+        query['client_id'] = {'$in': ids}
+    return query
+
+
+def purchases_query(args):
+    query = {}
+    statut = args.get('statut')
+    min_amount = float(args['min_amount']) if args.get('min_amount') else None
+    max_amount = float(args['max_amount']) if args.get('max_amount') else None
+    if statut:
+        query['statut'] = statut
+    if min_amount:
+        query['montant_total'] = {'$gte': min_amount}
+    if max_amount:
+        if 'montant_total' in query:
+            query['montant_total']['$lte'] = max_amount
+        else:
+            query['montant_total'] = {'$lte': max_amount}
+    return query
+
+
+def requested_fields(args):
+    fields = args.get('fields')
+    return [field.strip() for field in fields.split(',') if field.strip()] if fields else None
+
+
+def field_projection(collection, fields):
+    """Stored projection for API ``fields``, or None for whole documents."""
+    if not fields:
+        return None
+    projection = {stored_field(collection, field): 1 for field in fields}
+    if '_id' not in fields:
+        projection['_id'] = 0
+    return projection
+
+
+def page_limit(collection, args):
+    # A bulk client lookup returns every requested id in one page unless limit is given
+    ids = client_ids(args) if collection == COLLECTION_CLIENTS else None
+    return int(args.get('limit', max(50, len(ids)) if ids else 50))
+
+
+def page_query(collection, query, args):
+    """Plan one page of documents matching an API-level query.
+
+    With ``cursor`` the page starts right after the last document of the previous
+    one on ``(sort key, _id)``, so every page costs the same; ``page`` still skips.
+    """
+    limit = page_limit(collection, args)
+    page = int(args.get('page', 0))
+    # "-montant_total" sorts descending; the ascending indexes are walked backwards
+    sort_param = args.get('sort', PAGE_SORT_KEYS[collection][0])
+    sort_key = sort_param.lstrip('-')
+    if sort_key not in PAGE_SORT_KEYS[collection]:
+        raise ValueError(f"Invalid sort key: {sort_key} (expected one of {PAGE_SORT_KEYS[collection]}, '-' for descending)")
+    direction = -1 if sort_param.startswith('-') else 1
+
+    stored_query = encode_query(db, collection, query)
+    key = stored_field(collection, sort_key)
+    sort = [(key, direction)] if sort_key in UNIQUE_SORT_KEYS else [(key, direction), ("_id", direction)]
+
+    find_query = stored_query
+    token = args.get('cursor')
+    if token:
+        token_key, value, last_id = decode_cursor(token)
+        if token_key != sort_param:
+            raise ValueError("Cursor was issued for another sort key")
+        value = stored_value(collection, sort_key, value)
+        beyond = "$gt" if direction == 1 else "$lt"
+        if sort_key in UNIQUE_SORT_KEYS:
+            after = {key: {beyond: value}}
+        else:
+            after = {"$or": [{key: {beyond: value}}, {key: value, "_id": {beyond: last_id}}]}
+        find_query = {"$and": [stored_query, after]} if stored_query else after
+
+    fields = requested_fields(args)
+    projection = field_projection(collection, fields)
+    if projection:
+        # The cursor needs the sort key and _id even when they are not returned
+        projection.update({key: 1, '_id': 1})
+    else:
+        projection = {HASH_FIELD: 0}
+
+    return {
+        "collection": collection, "stored_query": stored_query, "find_query": find_query,
+        "projection": projection, "sort": sort, "skip": 0 if token else page * limit,
+        "limit": limit, "sort_key": sort_key, "sort_param": sort_param, "fields": fields,
+    }
+
+
+def page_result(plan, docs):
+    """Decode the ``limit + 1`` documents read for a page plan; return the page and the next cursor."""
+    limit, sort_key, fields = plan["limit"], plan["sort_key"], plan["fields"]
+    docs = [decode_document(db, plan["collection"], doc) for doc in docs]
+
+    next_token = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_token = encode_cursor(plan["sort_param"], docs[-1][sort_key], docs[-1]['_id'])
+    # ObjectId values are written as strings by the JSON encoder (serialize.py)
+    if fields:
+        docs = [{field: doc.get(field) for field in fields} for doc in docs]
+    return docs, next_token
+
+
+def paginate(collection, query, args):
+    """Return one page of documents, the next cursor and the stored query."""
+    plan = page_query(collection, query, args)
+    cursor = db[collection].find(plan["find_query"], plan["projection"]).sort(plan["sort"])
+    docs, next_token = page_result(plan, cursor.skip(plan["skip"]).limit(plan["limit"] + 1))
+    return docs, next_token, plan["stored_query"]
+
+
+def count_requested(args):
+    return args.get('count', 'true').lower() not in ('0', 'false', 'no')
+
+
+def count_key(generation, collection, stored_query):
+    return generation, collection, json.dumps(stored_query, sort_keys=True, default=str)
+
+
+def cached_count(key):
+    with _cache_lock:
+        if key in _counts:
+            _counts.move_to_end(key)
+            return _counts[key]
+    return None
+
+
+def store_count(key, total):
+    with _cache_lock:
+        _counts[key] = total
+        while len(_counts) > API_COUNT_CACHE_ENTRIES:
+            _counts.popitem(last=False)
+    return total
+
+
+def count_total(collection, stored_query, args):
+    """Total for a stored query: metadata count when unfiltered, cached per filter and sync otherwise."""
+    if not count_requested(args):
+        return None
+    if not stored_query:
+        return db[collection].estimated_document_count()
+
+    key = count_key(sync_generation()[0], collection, stored_query)
+    total = cached_count(key)
+    if total is None:
+        total = store_count(key, db[collection].count_documents(stored_query))
+    return total
+
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+
+# Registered before compress_response: after_request hooks run in reverse order, so sizes are the bytes sent
+@app.after_request
+def record_metrics(response):
+    if "request_started" in g:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        size = None if response.is_streamed else response.calculate_content_length()
+        metrics.observe_request(request.method, route, response.status_code,
+                                time.perf_counter() - g.request_started, size)
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    """Compress uncached JSON responses when the client accepts it (cached ones are compressed once in the cache)."""
+    if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+            or "Content-Encoding" in response.headers or response.mimetype != "application/json"):
+        return response
+    body = response.get_data()
+    encoding = serialize.negotiate_encoding(request.headers.get("Accept-Encoding"), len(body))
+    if encoding:
+        response.set_data(serialize.compress(body, encoding))
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def health_payload(healthy):
+    if not healthy:
+        return {"status": "unhealthy"}, 503
+    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}, 200
 
 
 @app.route('/api/health', methods=['GET'])
 def health():
-    """Health check endpoint."""
+    """Health check endpoint: 200 when MongoDB answers a ping, 503 otherwise."""
     try:
-        if db:
-            db.admin.command('ping')
-            return jsonify({"status": "healthy", "timestamp": datetime.utcnow().isoformat()}), 200
-    except:
-        pass
-    return jsonify({"status": "unhealthy"}), 503
+        # db.admin would be a collection named "admin": ping through the database itself
+        db.command('ping')
+        body, status = health_payload(True)
+    except Exception:
+        body, status = health_payload(False)
+    return jsonify(body), status
 
 
 @app.route('/api/clients', methods=['GET'])
+@cached_response
 def get_clients():
-    """Get all clients with optional filters."""
+    """Get all clients with optional filters, or several clients at once with ids=1,2,3."""
     try:
         page = int(request.args.get('page', 0))
-        limit = int(request.args.get('limit', 50))
-        pays = request.args.get('pays')
-        
-        query = {}
-        if pays:
-            query['pays'] = pays
-        
-        total = db[COLLECTION_CLIENTS].count_documents(query)
-        clients = list(db[COLLECTION_CLIENTS].find(query).skip(page * limit).limit(limit))
+        limit = page_limit(COLLECTION_CLIENTS, request.args)
+        query = clients_query(request.args)
         
-        # Convert ObjectId to string
-        for client in clients:
-            client['_id'] = str(client['_id'])
+        clients, next_token, stored_query = paginate(COLLECTION_CLIENTS, query, request.args)
+        total = count_total(COLLECTION_CLIENTS, stored_query, request.args)
         
         return jsonify({
             "total": total,
             "page": page,
             "limit": limit,
-            "data": clients
+            "data": clients,
+            "next": next_token
         }), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+API_SEARCH_MAX_LIMIT = int(os.getenv("API_SEARCH_MAX_LIMIT", 50))
+# Documents read per filter before ranking
+API_SEARCH_CANDIDATES = int(os.getenv("API_SEARCH_CANDIDATES", 200))
+SEARCH_PROJECTION = {"_id": 0, "keys": 0, HASH_FIELD: 0}
+
+
+def search_request(args):
+    """Query tokens, result limit and the (whole-word, prefix) filters of a client search."""
+    query = query_tokens(args.get('q'))
+    limit = max(1, min(int(args.get('limit', 10)), API_SEARCH_MAX_LIMIT))
+    return query, limit, search_filters(query)
+
+
+def search_result(args, query, limit, candidates):
+    data = rank_matches(candidates, query, limit)
+    return {"query": args.get('q'), "tokens": query, "count": len(data), "data": data}
+
+
+@app.route('/api/clients/search', methods=['GET'])
+@cached_response
+def search_clients():
+    """Search clients by name or email prefix (``q=wal`` matches "Walker"), best matches first."""
+    try:
+        query, limit, filters = search_request(request.args)
+        candidates = [
+            doc for query_filter in filters
+            for doc in db[COLLECTION_CLIENT_SEARCH].find(query_filter, SEARCH_PROJECTION).limit(API_SEARCH_CANDIDATES)
+        ]
+        return jsonify(search_result(request.args, query, limit, candidates)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+API_BUCKET_MAX_LIMIT = int(os.getenv("API_BUCKET_MAX_LIMIT", 120))
+
+
+def bucket_params(args):
+    """Page and size of the month buckets of a client detail."""
+    try:
+        bucket_page = int(args.get('bucket_page', 0))
+        bucket_limit = int(args.get('bucket_limit', 12))
+    except ValueError:
+        raise ValueError("bucket_page and bucket_limit must be integers")
+    if bucket_page < 0:
+        raise ValueError("bucket_page must be >= 0")
+    return bucket_page, max(1, min(bucket_limit, API_BUCKET_MAX_LIMIT))
+
+
+def client_purchases_query(client_id):
+    """(stored query, projection, sort) of a client's purchases, newest first, shaped like bucket purchases.
+
+    Read when the client's buckets are not built yet.
+    """
+    hidden = ["_id", HASH_FIELD] + [stored_field(COLLECTION_ACHATS, field) for field in ("client_id", "pays_id")]
+    projection = {field: 0 for field in hidden}
+    return (encode_query(db, COLLECTION_ACHATS, {"client_id": client_id}), projection,
+            [(stored_field(COLLECTION_ACHATS, "date_achat"), -1)])
+
+
+def client_detail(client, buckets, bucket_page, bucket_limit, purchases=None):
+    """Attach a page of month buckets (read with ``bucket_limit + 1``) to a client summary.
+
+    ``purchases`` (stored achats documents) replaces the bucket purchases when there are no buckets.
+    """
+    client['buckets'] = buckets[:bucket_limit]
+    if purchases is None:
+        client['purchases'] = [purchase for bucket in client['buckets'] for purchase in bucket['purchases']]
+    else:
+        client['purchases'] = [decode_document(db, COLLECTION_ACHATS, purchase) for purchase in purchases]
+    client['bucket_page'] = bucket_page
+    client['bucket_limit'] = bucket_limit
+    client['has_more'] = len(buckets) > bucket_limit
+    return client
+
+
 @app.route('/api/clients/<int:client_id>', methods=['GET'])
+@cached_response
 def get_client_detail(client_id):
-    """Get client details by ID."""
+    """Get client summary and a page of monthly purchase buckets, newest first."""
     try:
-        client = db[COLLECTION_CLIENTS].find_one({"client_id": client_id})
+        bucket_page, bucket_limit = bucket_params(request.args)
+
+        client = db[COLLECTION_CLIENT_SUMMARY].find_one({"client_id": client_id}, {"_id": 0, HASH_FIELD: 0})
+        if not client:
+            # Summaries not built yet: fall back to the raw client document
+            client = decode_document(db, COLLECTION_CLIENTS, db[COLLECTION_CLIENTS].find_one(
+                encode_query(db, COLLECTION_CLIENTS, {"client_id": client_id}), {"_id": 0, HASH_FIELD: 0}
+            ))
         if not client:
             return jsonify({"error": "Client not found"}), 404
-        
-        client['_id'] = str(client['_id'])
-        
-        # Get client purchases
-        purchases = list(db[COLLECTION_ACHATS].find({"client_id": client_id}))
-        for purchase in purchases:
-            purchase['_id'] = str(purchase['_id'])
-        
-        client['purchases'] = purchases
-        return jsonify(client), 200
+
+        buckets = list(
+            db[COLLECTION_ACHATS_BUCKETS].find({"client_id": client_id}, {"_id": 0, "client_id": 0})
+            .sort("mois", -1).skip(bucket_page * bucket_limit).limit(bucket_limit + 1)
+        )
+        purchases = None
+        if not buckets and bucket_page == 0:
+            # Buckets not built yet (or being rebuilt): read the purchases themselves
+            query, projection, sort = client_purchases_query(client_id)
+            purchases = list(db[COLLECTION_ACHATS].find(query, projection).sort(sort))
+        return jsonify(client_detail(client, buckets, bucket_page, bucket_limit, purchases)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @app.route('/api/purchases', methods=['GET'])
+@cached_response
 def get_purchases():
     """Get purchases with optional filters."""
     try:
         page = int(request.args.get('page', 0))
         limit = int(request.args.get('limit', 50))
-        statut = request.args.get('statut')
-        min_amount = request.args.get('min_amount', type=float)
-        max_amount = request.args.get('max_amount', type=float)
-        
-        query = {}
-        if statut:
-            query['statut'] = statut
-        if min_amount:
-            query['montant_total'] = {'$gte': min_amount}
-        if max_amount:
-            if 'montant_total' in query:
-                query['montant_total']['$lte'] = max_amount
-            else:
-                query['montant_total'] = {'$lte': max_amount}
+        query = purchases_query(request.args)
         
-        total = db[COLLECTION_ACHATS].count_documents(query)
-        purchases = list(db[COLLECTION_ACHATS].find(query).skip(page * limit).limit(limit))
-        
-        for purchase in purchases:
-            purchase['_id'] = str(purchase['_id'])
+        purchases, next_token, stored_query = paginate(COLLECTION_ACHATS, query, request.args)
+        total = count_total(COLLECTION_ACHATS, stored_query, request.args)
         
         return jsonify({
             "total": total,
             "page": page,
             "limit": limit,
-            "data": purchases
+            "data": purchases,
+            "next": next_token
         }), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+EXPORT_DATASETS = {
+    "clients": (COLLECTION_CLIENTS, clients_query, "client_id",
+                ["client_id", "nom", "email", "pays", "pays_id", "date_inscription"]),
+    "purchases": (COLLECTION_ACHATS, purchases_query, "achat_id",
+                  ["achat_id", "client_id", "produit_id", "produit", "categorie", "quantite", "prix_unitaire",
+                   "montant_total", "date_achat", "statut", "mode_paiement", "pays_id"]),
+}
+EXPORT_BATCH_SIZE = int(os.getenv("API_EXPORT_BATCH_SIZE", 5000))
+
+
+@app.route('/api/export/<dataset>', methods=['GET'])
+def export_dataset(dataset):
+    """Stream a filtered dataset as NDJSON, CSV, Arrow IPC or Parquet."""
+    if dataset not in EXPORT_DATASETS:
+        return jsonify({"error": f"Unknown dataset: {dataset}", "datasets": list(EXPORT_DATASETS)}), 404
+    try:
+        collection, build_query, key, default_fields = EXPORT_DATASETS[dataset]
+        file_format = request.args.get('format', 'ndjson')
+        if file_format not in export.FORMATS:
+            raise ValueError(f"Invalid format: {file_format} (expected one of {list(export.FORMATS)})")
+        batch_size = int(request.args.get('batch_size', EXPORT_BATCH_SIZE))
+        fields = requested_fields(request.args) or default_fields
+
+        cursor = db[collection].find(
+            encode_query(db, collection, build_query(request.args)), field_projection(collection, fields),
+            batch_size=batch_size,
+        ).sort(stored_field(collection, key), 1)
+
+        def batches():
+            rows = []
+            for doc in cursor:
+                rows.append(decode_document(db, collection, doc))
+                if len(rows) == batch_size:
+                    yield rows
+                    rows = []
+            if rows:
+                yield rows
+            cursor.close()
+
+        mimetype, extension = export.FORMATS[file_format]
+        response = app.response_class(
+            stream_with_context(export.stream_export(batches(), fields, file_format)), mimetype=mimetype
+        )
+        response.headers["Content-Disposition"] = f"attachment; filename={dataset}.{extension}"
+        return response
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+KPI_QUERY = ({"scope": "global"}, {"_id": 0, HASH_FIELD: 0, "scope": 0})
+
+
+def kpi_requested_live(args):
+    return args.get('live', 'false').lower() in ('1', 'true', 'yes')
+
+
+def precomputed_kpi(kpi):
+    date_update = kpi.get('date_update')
+    if isinstance(date_update, datetime):
+        kpi['date_update'] = date_update.isoformat()
+        kpi['calculated_at'] = date_update.strftime('%Y-%m-%d %H:%M:%S')
+    kpi['source'] = "precomputed"
+    return kpi
+
+
 @app.route('/api/kpi', methods=['GET'])
+@cached_response
 def get_kpi():
-    """Get current KPI - calculated from live data."""
+    """Get current KPI - precomputed by the sync, or calculated from live data with ?live=true."""
     try:
-        # Count collections
-        total_clients = db[COLLECTION_CLIENTS].count_documents({})
-        total_achats = db[COLLECTION_ACHATS].count_documents({})
-        
-        # Calculate from purchases
-        all_purchases = list(db[COLLECTION_ACHATS].find({}))
-        delivered = [p for p in all_purchases if p.get('statut') == 'livré']
-        cancelled = [p for p in all_purchases if p.get('statut') == 'annulé']
-        
-        ca_total = sum(p.get('montant_total', 0) for p in delivered)
-        panier_moyen = ca_total / len(delivered) if delivered else 0
-        taux_annulation = (len(cancelled) / total_achats * 100) if total_achats > 0 else 0
-        
-        kpi_data = {
-            "total_clients": total_clients,
-            "total_achats": total_achats,
-            "ca_total": round(ca_total, 2),
-            "panier_moyen": round(panier_moyen, 2),
-            "taux_annulation": round(taux_annulation, 2),
-            "date_update": datetime.utcnow().isoformat(),
-            "calculated_at": datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
-        }
-        
-        return jsonify(kpi_data), 200
+        kpi = None if kpi_requested_live(request.args) else db[COLLECTION_KPI].find_one(*KPI_QUERY)
+        if kpi:
+            return jsonify(precomputed_kpi(kpi)), 200
+
+        return jsonify(compute_live_kpi()), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-@app.route('/api/statistics', methods=['GET'])
-def get_statistics():
-    """Get various statistics."""
-    try:
+def live_kpi_pipeline():
+    """One server-side $group over achats computing every live KPI total."""
+    statut = f"${stored_field(COLLECTION_ACHATS, 'statut')}"
+    montant = f"${stored_field(COLLECTION_ACHATS, 'montant_total')}"
+    livre = {"$eq": [statut, stored_value(COLLECTION_ACHATS, "statut", "livré")]}
+    annule = {"$eq": [statut, stored_value(COLLECTION_ACHATS, "statut", "annulé")]}
+    return [
+        {"$group": {
+            "_id": None,
+            "total_achats": {"$sum": 1},
+            "ca_total": {"$sum": {"$cond": [livre, montant, 0]}},
+            "nb_livres": {"$sum": {"$cond": [livre, 1, 0]}},
+            "nb_annules": {"$sum": {"$cond": [annule, 1, 0]}},
+        }}
+    ]
+
+
+def live_kpi(totals, total_clients):
+    totals = totals or {"total_achats": 0, "ca_total": 0, "nb_livres": 0, "nb_annules": 0}
+    total_achats = totals['total_achats']
+    ca_total = api_value(COLLECTION_ACHATS, "montant_total", totals['ca_total'])
+    panier_moyen = ca_total / totals['nb_livres'] if totals['nb_livres'] else 0
+    taux_annulation = (totals['nb_annules'] / total_achats * 100) if total_achats > 0 else 0
+
+    return {
+        "total_clients": total_clients,
+        "total_achats": total_achats,
+        "ca_total": round(ca_total, 2),
+        "panier_moyen": round(panier_moyen, 2),
+        "taux_annulation": round(taux_annulation, 2),
+        "date_update": datetime.utcnow().isoformat(),
+        "calculated_at": datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+        "source": "live"
+    }
+
+
+def compute_live_kpi():
+    """Compute the KPI with one server-side $group over achats."""
+    totals = next(db[COLLECTION_ACHATS].aggregate(live_kpi_pipeline()), None)
+    return live_kpi(totals, db[COLLECTION_CLIENTS].count_documents({}))
+
+
+def statistics_queries():
+    """Independent aggregations behind /api/statistics: name -> (collection, pipeline)."""
+    return {
         # Count by status
-        status_stats = list(db[COLLECTION_ACHATS].aggregate([
+        "by_status": (COLLECTION_ACHATS, [
+            *decode_stages(COLLECTION_ACHATS, ["statut", "montant_total"]),
             {"$group": {"_id": "$statut", "count": {"$sum": 1}, "total_amount": {"$sum": "$montant_total"}}}
-        ]))
-        
+        ]),
         # Count by country
-        country_stats = list(db[COLLECTION_CLIENTS].aggregate([
+        "by_country": (COLLECTION_CLIENTS, [
+            *decode_stages(COLLECTION_CLIENTS, ["pays"]),
             {"$group": {"_id": "$pays", "count": {"$sum": 1}}}
-        ]))
-        
+        ]),
         # Count by category
-        category_stats = list(db[COLLECTION_ACHATS].aggregate([
+        "by_category": (COLLECTION_ACHATS, [
+            *decode_stages(COLLECTION_ACHATS, ["categorie", "montant_total"]),
             {"$group": {"_id": "$categorie", "count": {"$sum": 1}, "total_amount": {"$sum": "$montant_total"}}}
-        ]))
-        
+        ]),
+    }
+
+
+@app.route('/api/statistics', methods=['GET'])
+@cached_response
+def get_statistics():
+    """Get various statistics."""
+    try:
+        return jsonify({
+            name: list(db[collection].aggregate(pipeline))
+            for name, (collection, pipeline) in statistics_queries().items()
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/analytics', methods=['GET'])
+def get_analytics():
+    """Ad-hoc group-by over the gold fact_achats table, held in memory as Arrow."""
+    try:
+        return jsonify(analytics.run_query(request.args)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+TIMESERIES_PROJECTION = {"_id": 0, "date": 1, "ca": 1, "nb_achats": 1}
+
+
+@app.route('/api/timeseries', methods=['GET'])
+@cached_response
+def get_timeseries():
+    """Delivered revenue and orders over time from agg_par_jour, downsampled to a point budget."""
+    try:
+        query = timeseries.parse_query(request.args)
+        rows = list(db[timeseries.SOURCE].find(timeseries.source_filter(query), TIMESERIES_PROJECTION).sort("date", 1))
+        return jsonify(timeseries.build_series(rows, query)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/aggregates', methods=['GET'])
+@cached_response
+def list_aggregates():
+    """List the gold aggregates materialized by the sync."""
+    try:
         return jsonify({
-            "by_status": status_stats,
-            "by_country": country_stats,
-            "by_category": category_stats
+            "data": [
+                {"name": name, "key": spec["key"], "count": db[name].estimated_document_count()}
+                for name, spec in GOLD_AGGREGATES.items()
+            ]
         }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def aggregate_limit(args):
+    """Rows of an aggregate to return, 0 for all of them."""
+    try:
+        limit = int(args.get('limit', 0))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 0:
+        raise ValueError("limit must be >= 0")
+    return limit
+
+
+@app.route('/api/aggregates/<name>', methods=['GET'])
+@cached_response
+def get_aggregate(name):
+    """Get a precomputed gold aggregate (ca_par_pays, agg_par_mois, ...)."""
+    try:
+        spec = GOLD_AGGREGATES.get(name)
+        if spec is None:
+            return jsonify({"error": f"Unknown aggregate: {name}"}), 404
+        limit = aggregate_limit(request.args)
+
+        rows = list(db[name].find({}, {"_id": 0, HASH_FIELD: 0}).sort(spec["sort"]).limit(limit))
+        return jsonify({"name": name, "data": rows}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def sync_log_query(args):
+    days = int(args.get('days', 7))
+    return {"timestamp": {"$gte": datetime.utcnow() - timedelta(days=days)}}
+
+
+def format_sync_logs(logs):
+    for log in logs:
+        log['timestamp'] = log['timestamp'].isoformat() if isinstance(log['timestamp'], datetime) else str(log['timestamp'])
+    return logs
+
+
+# Not cached: the days window is relative to now, not to the last sync
 @app.route('/api/sync-log', methods=['GET'])
 def get_sync_log():
     """Get synchronization logs."""
     try:
-        days = int(request.args.get('days', 7))
-        since = datetime.utcnow() - timedelta(days=days)
-        
-        logs = list(db[COLLECTION_SYNC_LOG].find(
-            {"timestamp": {"$gte": since}}
-        ).sort("timestamp", -1).limit(100))
-        
-        for log in logs:
-            log['_id'] = str(log['_id'])
-            log['timestamp'] = log['timestamp'].isoformat() if isinstance(log['timestamp'], datetime) else str(log['timestamp'])
-        
-        return jsonify({"data": logs}), 200
+        logs = list(db[COLLECTION_SYNC_LOG].find(sync_log_query(request.args)).sort("timestamp", -1).limit(100))
+        return jsonify({"data": format_sync_logs(logs)}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def status_payload(clients_count, purchases_count, kpi_count, latest_sync):
+    return {
+        "clients": clients_count,
+        "purchases": purchases_count,
+        "kpi": kpi_count,
+        "last_sync": latest_sync['timestamp'].isoformat() if latest_sync and isinstance(latest_sync.get('timestamp'), datetime) else None,
+        "database": MONGODB_DATABASE
+    }
+
+
 @app.route('/api/status', methods=['GET'])
+@cached_response
 def get_status():
     """Get overall system status."""
     try:
@@ -213,17 +847,78 @@ def get_status():
         # Get latest sync time
         latest_sync = db[COLLECTION_SYNC_LOG].find_one({}, sort=[('timestamp', -1)])
         
-        return jsonify({
-            "clients": clients_count,
-            "purchases": purchases_count,
-            "kpi": kpi_count,
-            "last_sync": latest_sync['timestamp'].isoformat() if latest_sync and isinstance(latest_sync.get('timestamp'), datetime) else None,
-            "database": db.name
-        }), 200
+        return jsonify(status_payload(clients_count, purchases_count, kpi_count, latest_sync)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+API_BATCH_MAX_QUERIES = int(os.getenv("API_BATCH_MAX_QUERIES", 20))
+API_BATCH_WORKERS = int(os.getenv("API_BATCH_WORKERS", 8))
+# Views that cannot run as a batch sub-query (streaming, recursion, static files)
+BATCH_EXCLUDED = {"batch", "export_dataset", "index", "static"}
+
+_batch_pool = ThreadPoolExecutor(max_workers=API_BATCH_WORKERS)
+
+
+def run_subquery(path, headers):
+    """Run one GET sub-query through its API view (and the response cache); return (status, JSON body)."""
+    url = urlsplit(path)
+    try:
+        endpoint, view_args = app.url_map.bind("localhost").match(url.path, method="GET")
+    except HTTPException as e:
+        return e.code, {"error": e.name}
+    if not url.path.startswith("/api/") or endpoint in BATCH_EXCLUDED:
+        return 400, {"error": f"Not allowed in a batch: {url.path}"}
+
+    with app.test_request_context(url.path, query_string=url.query, headers=headers):
+        try:
+            response = app.make_response(app.view_functions[endpoint](**view_args))
+        except Exception as e:
+            return 500, {"error": str(e)}
+    return response.status_code, response.get_json(silent=True)
+
+
+@app.route('/api/batch', methods=['GET', 'POST'])
+def batch():
+    """Run several named GET sub-queries in parallel and return them in one response.
+
+    POST {"kpi": "/api/kpi", "top": "/api/clients?limit=10"} or GET /api/batch?kpi=/api/kpi&...
+    """
+    try:
+        queries = request.get_json(silent=True) if request.method == 'POST' else request.args.to_dict()
+        if not isinstance(queries, dict) or not queries:
+            raise ValueError("Expected an object of named sub-queries: {\"name\": \"/api/...\"}")
+        if len(queries) > API_BATCH_MAX_QUERIES:
+            raise ValueError(f"Too many sub-queries: {len(queries)} (max {API_BATCH_MAX_QUERIES})")
+        if not all(isinstance(path, str) for path in queries.values()):
+            raise ValueError("Sub-queries must be GET paths such as /api/kpi")
+
+        # Cache-Control: no-cache on the batch applies to every sub-query
+        headers = {"Cache-Control": request.headers["Cache-Control"]} if "Cache-Control" in request.headers else {}
+        futures = {name: _batch_pool.submit(run_subquery, path, headers) for name, path in queries.items()}
+        results = {}
+        for name, future in futures.items():
+            status, data = future.result()
+            results[name] = {"status": status, "data": data}
+        return jsonify({"results": results}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Request and MongoDB command metrics of this worker, in Prometheus text format."""
+    return app.response_class(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route('/api/slow-queries', methods=['GET'])
+def get_slow_queries():
+    """Latest MongoDB commands slower than MONGODB_SLOW_QUERY_MS, newest first."""
+    return jsonify({"threshold_ms": metrics.MONGODB_SLOW_QUERY_MS, "data": list(reversed(metrics.slow_queries))}), 200
+
+
 @app.route('/')
 def index():
     """Serve dashboard."""
@@ -0,0 +1,346 @@
+import asyncio
+import inspect
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Match, Mount, Route
+from werkzeug.http import http_date, parse_etags, quote_etag
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+from config import (
+    MONGODB_URI, MONGODB_DATABASE,
+    COLLECTION_CLIENTS, COLLECTION_ACHATS, COLLECTION_KPI, COLLECTION_SYNC_LOG,
+    COLLECTION_CLIENT_SUMMARY, COLLECTION_ACHATS_BUCKETS, COLLECTION_CLIENT_SEARCH, HASH_FIELD, GOLD_AGGREGATES,
+    encode_query, decode_document
+)
+import app as flask_api
+import metrics
+import serialize
+import timeseries
+
+try:
+    from pymongo import AsyncMongoClient
+except ImportError:
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient as AsyncMongoClient
+    except ImportError:
+        raise ImportError("The ASGI API needs pymongo>=4.9 (AsyncMongoClient) or motor") from None
+
+# Dimension lookups of the compact schema (config/schema.py) stay on the
+# synchronous handle: they are cached in memory and only hit MongoDB after a sync.
+sync_db = flask_api.db
+
+_client = {"pid": None, "client": None}
+
+
+def get_async_database():
+    """Async database handle, created on first use in each worker process."""
+    if _client["pid"] != os.getpid():
+        _client["client"] = AsyncMongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000)
+        _client["pid"] = os.getpid()
+    return _client["client"][MONGODB_DATABASE]
+
+
+def json_response(content, status_code=200):
+    """Serialize with the Flask app's encoder so both serving modes return identical bodies."""
+    return Response(serialize.dumps(content), status_code=status_code, media_type="application/json")
+
+
+async def to_list(cursor):
+    return await cursor.to_list(None)
+
+
+async def aggregate(collection, pipeline):
+    # pymongo's async driver returns an awaitable, motor a cursor
+    cursor = collection.aggregate(pipeline)
+    if inspect.isawaitable(cursor):
+        cursor = await cursor
+    return await cursor.to_list(None)
+
+
+async def sync_generation(db):
+    if flask_api.generation_due():
+        latest = await db[COLLECTION_SYNC_LOG].find_one(*flask_api.LATEST_SYNC_QUERY, sort=flask_api.LATEST_SYNC_SORT)
+        return flask_api.update_generation(latest)
+    return flask_api.current_generation()
+
+
+def cached_response(handler):
+    """Async counterpart of app.cached_response, sharing its cache, ETags and invalidation."""
+    async def wrapper(request):
+        if flask_api.kpi_requested_live(request.query_params):
+            return await handler(request)
+        try:
+            generation, last_modified = await sync_generation(get_async_database())
+        except Exception:
+            return await handler(request)
+        key = flask_api.cache_key(generation, request.url.path, request.query_params)
+
+        refresh = "no-cache" in request.headers.get("cache-control", "")
+        entry = None if refresh else flask_api.cache_get(key)
+        if entry is None:
+            response = await handler(request)
+            if response.status_code != 200:
+                return response
+            entry = flask_api.cache_put(key, response.body, response.media_type)
+            cache_status = "MISS"
+        else:
+            cache_status = "HIT"
+
+        encoding = serialize.negotiate_encoding(request.headers.get("accept-encoding"), len(entry["body"]))
+        etag = flask_api.entry_etag(entry, encoding)
+        headers = {"ETag": quote_etag(etag), "Cache-Control": "no-cache", "X-Cache": cache_status,
+                   "Vary": "Accept-Encoding"}
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        if isinstance(last_modified, datetime):
+            headers["Last-Modified"] = http_date(last_modified)
+        if parse_etags(request.headers.get("if-none-match")).contains(etag):
+            headers.pop("Content-Encoding", None)
+            return Response(status_code=304, headers=headers)
+        body = flask_api.encoded_body(key, entry, encoding)
+        return Response(body, media_type=entry["mimetype"], headers=headers)
+    return wrapper
+
+
+def endpoint(handler):
+    """Map errors to the same JSON bodies as the Flask views."""
+    async def wrapper(request):
+        try:
+            return await handler(request, get_async_database())
+        except ValueError as e:
+            return json_response({"error": str(e)}, 400)
+        except Exception as e:
+            return json_response({"error": str(e)}, 500)
+    return wrapper
+
+
+async def count_total(db, collection, stored_query, args):
+    if not flask_api.count_requested(args):
+        return None
+    if not stored_query:
+        return await db[collection].estimated_document_count()
+
+    generation, _ = await sync_generation(db)
+    key = flask_api.count_key(generation, collection, stored_query)
+    total = flask_api.cached_count(key)
+    if total is None:
+        total = flask_api.store_count(key, await db[collection].count_documents(stored_query))
+    return total
+
+
+async def paginated(db, collection, query, args):
+    plan = flask_api.page_query(collection, query, args)
+    cursor = db[collection].find(plan["find_query"], plan["projection"]).sort(plan["sort"])
+    docs, total = await asyncio.gather(
+        to_list(cursor.skip(plan["skip"]).limit(plan["limit"] + 1)),
+        count_total(db, collection, plan["stored_query"], args),
+    )
+    data, next_token = flask_api.page_result(plan, docs)
+    return json_response({
+        "total": total,
+        "page": int(args.get('page', 0)),
+        "limit": plan["limit"],
+        "data": data,
+        "next": next_token
+    })
+
+
+async def health(request):
+    try:
+        await get_async_database().command('ping')
+        body, status = flask_api.health_payload(True)
+    except Exception:
+        body, status = flask_api.health_payload(False)
+    return json_response(body, status)
+
+
+@cached_response
+@endpoint
+async def get_clients(request, db):
+    args = request.query_params
+    return await paginated(db, COLLECTION_CLIENTS, flask_api.clients_query(args), args)
+
+
+@cached_response
+@endpoint
+async def search_clients(request, db):
+    args = request.query_params
+    query, limit, filters = flask_api.search_request(args)
+    results = await asyncio.gather(*(
+        to_list(db[COLLECTION_CLIENT_SEARCH].find(query_filter, flask_api.SEARCH_PROJECTION)
+                .limit(flask_api.API_SEARCH_CANDIDATES))
+        for query_filter in filters
+    ))
+    candidates = [doc for docs in results for doc in docs]
+    return json_response(flask_api.search_result(args, query, limit, candidates))
+
+
+@cached_response
+@endpoint
+async def get_client_detail(request, db):
+    client_id = request.path_params["client_id"]
+    bucket_page, bucket_limit = flask_api.bucket_params(request.query_params)
+
+    client, buckets = await asyncio.gather(
+        db[COLLECTION_CLIENT_SUMMARY].find_one({"client_id": client_id}, {"_id": 0, HASH_FIELD: 0}),
+        to_list(db[COLLECTION_ACHATS_BUCKETS].find({"client_id": client_id}, {"_id": 0, "client_id": 0})
+                .sort("mois", -1).skip(bucket_page * bucket_limit).limit(bucket_limit + 1)),
+    )
+    if not client:
+        client = decode_document(sync_db, COLLECTION_CLIENTS, await db[COLLECTION_CLIENTS].find_one(
+            encode_query(sync_db, COLLECTION_CLIENTS, {"client_id": client_id}), {"_id": 0, HASH_FIELD: 0}
+        ))
+    if not client:
+        return json_response({"error": "Client not found"}, 404)
+    purchases = None
+    if not buckets and bucket_page == 0:
+        query, projection, sort = flask_api.client_purchases_query(client_id)
+        purchases = await to_list(db[COLLECTION_ACHATS].find(query, projection).sort(sort))
+    return json_response(flask_api.client_detail(client, buckets, bucket_page, bucket_limit, purchases))
+
+
+@cached_response
+@endpoint
+async def get_purchases(request, db):
+    args = request.query_params
+    return await paginated(db, COLLECTION_ACHATS, flask_api.purchases_query(args), args)
+
+
+@cached_response
+@endpoint
+async def get_kpi(request, db):
+    if not flask_api.kpi_requested_live(request.query_params):
+        kpi = await db[COLLECTION_KPI].find_one(*flask_api.KPI_QUERY)
+        if kpi:
+            return json_response(flask_api.precomputed_kpi(kpi))
+
+    totals, total_clients = await asyncio.gather(
+        aggregate(db[COLLECTION_ACHATS], flask_api.live_kpi_pipeline()),
+        db[COLLECTION_CLIENTS].count_documents({}),
+    )
+    return json_response(flask_api.live_kpi(totals[0] if totals else None, total_clients))
+
+
+@cached_response
+@endpoint
+async def get_statistics(request, db):
+    queries = flask_api.statistics_queries()
+    results = await asyncio.gather(*(
+        aggregate(db[collection], pipeline) for collection, pipeline in queries.values()
+    ))
+    return json_response(dict(zip(queries, results)))
+
+
+@cached_response
+@endpoint
+async def list_aggregates(request, db):
+    counts = await asyncio.gather(*(db[name].estimated_document_count() for name in GOLD_AGGREGATES))
+    return json_response({
+        "data": [
+            {"name": name, "key": spec["key"], "count": count}
+            for (name, spec), count in zip(GOLD_AGGREGATES.items(), counts)
+        ]
+    })
+
+
+@cached_response
+@endpoint
+async def get_aggregate(request, db):
+    name = request.path_params["name"]
+    spec = GOLD_AGGREGATES.get(name)
+    if spec is None:
+        return json_response({"error": f"Unknown aggregate: {name}"}, 404)
+    limit = flask_api.aggregate_limit(request.query_params)
+
+    rows = await to_list(db[name].find({}, {"_id": 0, HASH_FIELD: 0}).sort(spec["sort"]).limit(limit))
+    return json_response({"name": name, "data": rows})
+
+
+@cached_response
+@endpoint
+async def get_timeseries(request, db):
+    query = timeseries.parse_query(request.query_params)
+    rows = await to_list(db[timeseries.SOURCE].find(timeseries.source_filter(query), flask_api.TIMESERIES_PROJECTION)
+                         .sort("date", 1))
+    return json_response(timeseries.build_series(rows, query))
+
+
+@endpoint
+async def get_sync_log(request, db):
+    query = flask_api.sync_log_query(request.query_params)
+    logs = await to_list(db[COLLECTION_SYNC_LOG].find(query).sort("timestamp", -1).limit(100))
+    return json_response({"data": flask_api.format_sync_logs(logs)})
+
+
+@cached_response
+@endpoint
+async def get_status(request, db):
+    clients_count, purchases_count, kpi_count, latest_sync = await asyncio.gather(
+        db[COLLECTION_CLIENTS].count_documents({}),
+        db[COLLECTION_ACHATS].count_documents({}),
+        db[COLLECTION_KPI].count_documents({}),
+        db[COLLECTION_SYNC_LOG].find_one({}, sort=[('timestamp', -1)]),
+    )
+    return json_response(flask_api.status_payload(clients_count, purchases_count, kpi_count, latest_sync))
+
+
+class MetricsMiddleware:
+    """Record request metrics for the async routes; requests falling through to Flask are recorded by its hooks."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(
+                route.matches(scope)[0] == Match.FULL for route in routes if isinstance(route, Route)):
+            return await self.app(scope, receive, send)
+
+        # Same route labels as the Flask app (/api/clients/<int:client_id>)
+        rule, _ = flask_api.app.url_map.bind("localhost").match(scope["path"], return_rule=True)
+        state = {"status": 500, "size": 0, "started": time.perf_counter()}
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["size"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            metrics.observe_request(scope["method"], rule.rule, state["status"],
+                                    time.perf_counter() - state["started"], state["size"])
+
+
+routes = [
+    Route('/api/health', health),
+    Route('/api/clients', get_clients),
+    Route('/api/clients/search', search_clients),
+    Route('/api/clients/{client_id:int}', get_client_detail),
+    Route('/api/purchases', get_purchases),
+    Route('/api/kpi', get_kpi),
+    Route('/api/statistics', get_statistics),
+    Route('/api/aggregates', list_aggregates),
+    Route('/api/aggregates/{name}', get_aggregate),
+    Route('/api/timeseries', get_timeseries),
+    Route('/api/sync-log', get_sync_log),
+    Route('/api/status', get_status),
+    # Endpoints without an async port (exports, dashboard) are served by the Flask app
+    Mount('/', app=WSGIMiddleware(flask_api.app)),
+]
+
+app = Starlette(routes=routes, middleware=[
+    Middleware(CORSMiddleware, allow_origins=["*"]),
+    Middleware(MetricsMiddleware),
+])
@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+DEFAULT_PATHS = [
+    "/api/clients",
+    "/api/clients/1",
+    "/api/purchases?statut=livré",
+    "/api/kpi",
+    "/api/statistics",
+    "/api/status",
+]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run_level(base_url: str, paths: list[str], concurrency: int, requests: int, no_cache: bool) -> dict:
+    """Send ``requests`` GETs cycling over ``paths`` with ``concurrency`` requests in flight."""
+    headers = {"Cache-Control": "no-cache"} if no_cache else {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies, errors = [], {}
+    queue = iter(range(requests))
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        async def worker():
+            for i in queue:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(paths[i % len(paths)])
+                    if response.status_code >= 400:
+                        errors[response.status_code] = errors.get(response.status_code, 0) + 1
+                        continue
+                except httpx.HTTPError as e:
+                    errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                    continue
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "ok": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "mean": statistics.fmean(latencies) if latencies else 0.0,
+    }
+
+
+def print_table(results: list[dict]) -> None:
+    print(f"{'concurrence':>11} {'ok':>8} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'moy ms':>9}  erreurs")
+    for r in results:
+        errors = ", ".join(f"{k}: {v}" for k, v in r["errors"].items()) or "-"
+        print(f"{r['concurrency']:>11} {r['ok']:>8} {r['rps']:>9.0f} {r['p50']:>9.1f} "
+              f"{r['p99']:>9.1f} {r['mean']:>9.1f}  {errors}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mesure p50/p99 de l'API sous charge concurrente")
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--requests", type=int, default=5000, help="requêtes par niveau de concurrence")
+    parser.add_argument("--no-cache", action="store_true", help="envoie Cache-Control: no-cache (contourne le cache de réponses)")
+    parser.add_argument("paths", nargs="*", help="chemins GET à interroger (défaut: jeu représentatif)")
+    args = parser.parse_args()
+
+    print(f"📈 Benchmark {args.url} ({args.requests} requêtes par niveau)")
+    results = [
+        asyncio.run(run_level(args.url, args.paths or DEFAULT_PATHS, level, args.requests, args.no_cache))
+        for level in args.concurrency
+    ]
+    print_table(results)
@@ -0,0 +1,96 @@
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.append(str(Path(__file__).parent))
+import serialize
+
+
+def purchases_page(rows: int) -> dict:
+    """A /api/purchases page shaped like the real documents."""
+    start = datetime(2024, 1, 1)
+    data = [
+        {
+            "_id": ObjectId(),
+            "achat_id": i,
+            "client_id": random.randint(1, 100_000),
+            "produit_id": random.randint(1, 500),
+            "produit": f"Produit {random.randint(1, 500)}",
+            "categorie": random.choice(["Électronique", "Vêtements", "Maison", "Sport"]),
+            "quantite": random.randint(1, 5),
+            "prix_unitaire": round(random.uniform(5, 500), 2),
+            "montant_total": round(random.uniform(5, 2500), 2),
+            "date_achat": (start + timedelta(days=random.randint(0, 700))).strftime("%Y-%m-%d"),
+            "statut": random.choice(["livré", "en cours", "annulé"]),
+            "mode_paiement": random.choice(["carte", "paypal", "virement"]),
+            "pays_id": random.randint(1, 20),
+        }
+        for i in range(rows)
+    ]
+    return {"total": 1_000_000, "page": 0, "limit": rows, "data": data, "next": "WyJhY2hhdF9pZCIsIDEwMDBd"}
+
+
+def measure(label: str, render, page: dict, repeat: int) -> dict:
+    body = render(page)
+    wall, cpu = time.perf_counter(), time.process_time()
+    for _ in range(repeat):
+        render(page)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return {"label": label, "ms": wall / repeat * 1000, "cpu_ms": cpu / repeat * 1000, "bytes": len(body)}
+
+
+def before(app: Flask):
+    provider = DefaultJSONProvider(app)
+
+    def render(page):
+        # Previous path: stringify every _id in Python, then jsonify
+        docs = [dict(doc) for doc in page["data"]]
+        for doc in docs:
+            doc["_id"] = str(doc["_id"])
+        return provider.response({**page, "data": docs}).get_data()
+    return render
+
+
+def after(app: Flask, encoding: str | None = None):
+    provider = serialize.FastJSONProvider(app)
+
+    def render(page):
+        body = provider.response(page).get_data()
+        return serialize.compress(body, encoding) if encoding else body
+    return render
+
+
+def run(rows: int, repeat: int) -> list[dict]:
+    random.seed(42)
+    app = Flask("bench")
+    page = purchases_page(rows)
+    with app.app_context():
+        results = [
+            measure("avant: str(_id) + jsonify", before(app), page, repeat),
+            measure("après: " + ("orjson" if serialize.orjson else "json (orjson absent)"), after(app), page, repeat),
+        ]
+        for encoding in serialize.ENCODINGS:
+            results.append(measure(f"après + {encoding}", after(app, encoding), page, repeat))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmark de la sérialisation des réponses de l'API")
+    parser.add_argument("--rows", type=int, default=1000, help="documents par page")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"📦 Page de {args.rows} achats, {args.repeat} répétitions")
+    results = run(args.rows, args.repeat)
+    baseline = results[0]
+    print(f"{'':34} {'ms/req':>8} {'CPU ms':>8} {'octets':>10} {'gain':>6}")
+    for r in results:
+        print(f"{r['label']:34} {r['ms']:>8.2f} {r['cpu_ms']:>8.2f} {r['bytes']:>10,} "
+              f"{baseline['cpu_ms'] / r['cpu_ms']:>5.1f}x")
@@ -0,0 +1,123 @@
+import csv
+import io
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Column types of the exported datasets, so every batch shares one Arrow schema
+COLUMN_TYPES = {
+    "achat_id": pa.int64(),
+    "client_id": pa.int64(),
+    "produit_id": pa.int64(),
+    "pays_id": pa.int64(),
+    "quantite": pa.int64(),
+    "prix_unitaire": pa.float64(),
+    "montant_total": pa.float64(),
+    "produit": pa.string(),
+    "categorie": pa.string(),
+    "date_achat": pa.string(),
+    "statut": pa.string(),
+    "mode_paiement": pa.string(),
+    "nom": pa.string(),
+    "email": pa.string(),
+    "pays": pa.string(),
+    "date_inscription": pa.string(),
+}
+
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only stream collecting bytes until ``drain`` hands them out, tracking the total offset."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def schema_for(fields: list[str]) -> pa.Schema:
+    return pa.schema([(field, COLUMN_TYPES.get(field, pa.string())) for field in fields])
+
+
+def _record_batch(rows: list[dict], schema: pa.Schema) -> pa.RecordBatch:
+    columns = {field: [row.get(field) for row in rows] for field in schema.names}
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def iter_ndjson(batches, fields: list[str]):
+    for rows in batches:
+        yield "".join(
+            json.dumps({field: row.get(field) for field in fields}, ensure_ascii=False, default=str) + "\n"
+            for row in rows
+        ).encode()
+
+
+def iter_csv(batches, fields: list[str]):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.getvalue():
+        yield buffer.getvalue().encode()
+
+
+def iter_arrow(batches, fields: list[str]):
+    schema = schema_for(fields)
+    sink = ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for rows in batches:
+            writer.write_batch(_record_batch(rows, schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def iter_parquet(batches, fields: list[str]):
+    schema = schema_for(fields)
+    sink = ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for rows in batches:
+            # One row group per batch, flushed to the client as soon as it is written
+            writer.write_batch(_record_batch(rows, schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+WRITERS = {
+    "ndjson": iter_ndjson,
+    "csv": iter_csv,
+    "arrow": iter_arrow,
+    "parquet": iter_parquet,
+}
+
+
+def stream_export(batches, fields: list[str], file_format: str):
+    """Serialize an iterable of row batches chunk by chunk in ``file_format``."""
+    for chunk in WRITERS[file_format](batches, fields):
+        if chunk:
+            yield chunk
@@ -0,0 +1,196 @@
+import sys
+from pathlib import Path
+from pymongo import monitoring
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config import MONGODB_DATABASE
+
+RECORDED_COMMANDS = ("find", "aggregate", "count", "distinct")
+RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$regex", "$exists", "$not"}
+# Session and routing fields added by the driver, not accepted inside explain
+DRIVER_FIELDS = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "readConcern", "apiVersion"}
+
+# Representative API calls replayed to collect the query shapes
+DEFAULT_REQUESTS = [
+    "/api/clients",
+    "/api/clients?pays=France&page=1",
+    "/api/clients/1",
+    "/api/purchases",
+    "/api/purchases?statut=livré",
+    "/api/purchases?statut=livré&min_amount=100&max_amount=500",
+    "/api/purchases?min_amount=1000",
+    "/api/kpi",
+    "/api/statistics",
+    "/api/aggregates/ca_par_pays",
+    "/api/sync-log",
+    "/api/status",
+]
+
+
+class QueryShapeRecorder(monitoring.CommandListener):
+    """Collect one sample command per query shape sent to the analytics database."""
+
+    def __init__(self):
+        self.shapes = {}
+        self.recording = True
+
+    def started(self, event):
+        if not self.recording or event.database_name != MONGODB_DATABASE:
+            return
+        if event.command_name not in RECORDED_COMMANDS:
+            return
+        command = {k: v for k, v in event.command.items() if k not in DRIVER_FIELDS}
+        shape = query_shape(command)
+        entry = self.shapes.setdefault(shape["key"], {**shape, "command": command, "calls": 0})
+        entry["calls"] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def _classify(filter_doc: dict) -> tuple[list, list]:
+    equality, ranges = [], []
+    for field, value in filter_doc.items():
+        if field.startswith("$"):
+            continue
+        if isinstance(value, dict) and any(op in RANGE_OPERATORS for op in value):
+            ranges.append(field)
+        else:
+            equality.append(field)
+    return equality, ranges
+
+
+def query_shape(command: dict) -> dict:
+    command_name = next(iter(command))
+    collection = command[command_name]
+    filter_doc, sort = command.get("filter") or command.get("query") or {}, command.get("sort") or {}
+    if command_name == "aggregate":
+        pipeline = command.get("pipeline", [])
+        stages = [next(iter(stage)) for stage in pipeline]
+        if stages and stages[0] == "$match":
+            filter_doc = pipeline[0]["$match"]
+            if len(stages) > 1 and stages[1] == "$sort":
+                sort = pipeline[1]["$sort"]
+        elif stages and stages[0] == "$sort":
+            sort = pipeline[0]["$sort"]
+    equality, ranges = _classify(filter_doc)
+    sort = list(sort.items())
+    return {
+        "key": (collection, command_name, tuple(sorted(equality)), tuple(sort), tuple(sorted(ranges))),
+        "collection": collection,
+        "command_name": command_name,
+        "equality": sorted(equality),
+        "sort": sort,
+        "ranges": sorted(ranges),
+    }
+
+
+def suggest_index(shape: dict) -> list[tuple[str, int]]:
+    """Order keys by the ESR rule: equality fields, then sort fields, then range fields."""
+    keys = [(field, 1) for field in shape["equality"]]
+    keys += [(field, direction) for field, direction in shape["sort"] if field not in shape["equality"]]
+    keys += [(field, 1) for field in shape["ranges"] if field not in dict(keys)]
+    return keys
+
+
+def _find_all(node, key: str) -> list:
+    found = []
+    if isinstance(node, dict):
+        for k, v in node.items():
+            if k == key:
+                found.append(v)
+            found += _find_all(v, key)
+    elif isinstance(node, list):
+        for item in node:
+            found += _find_all(item, key)
+    return found
+
+
+def explain(db, command: dict) -> dict:
+    result = db.command("explain", command, verbosity="executionStats")
+    plans = _find_all(result, "winningPlan")
+    stats = (_find_all(result, "executionStats") or [{}])[0]
+    return {
+        "stages": sorted({stage for plan in plans for stage in _find_all(plan, "stage")}),
+        "docs_examined": stats.get("totalDocsExamined", 0),
+        "keys_examined": stats.get("totalKeysExamined", 0),
+        "returned": stats.get("nReturned", 0),
+    }
+
+
+def _covered(db, collection: str, keys: list) -> bool:
+    for index in db[collection].index_information().values():
+        if [field for field, _ in index["key"]][:len(keys)] == [field for field, _ in keys]:
+            return True
+    return False
+
+
+def analyze(db, shapes: dict, max_ratio: float = 10.0) -> list[dict]:
+    """Explain every recorded shape and flag collection scans and poorly selective plans."""
+    report = []
+    for shape in shapes.values():
+        plan = explain(db, shape["command"])
+        ratio = plan["docs_examined"] / max(plan["returned"], 1)
+        problems = []
+        if "COLLSCAN" in plan["stages"]:
+            problems.append("COLLSCAN")
+        if plan["docs_examined"] and ratio > max_ratio:
+            problems.append(f"{ratio:.0f} documents lus par document renvoyé")
+
+        suggestion = suggest_index(shape) if problems else []
+        covered = bool(suggestion) and _covered(db, shape["collection"], suggestion)
+        report.append({**shape, **plan, "ratio": round(ratio, 2), "problems": problems,
+                       "suggestion": None if covered else suggestion or None, "covered": covered})
+    return report
+
+
+def print_report(report: list[dict]) -> None:
+    for entry in sorted(report, key=lambda e: (not e["problems"], e["collection"])):
+        status = "⚠" if entry["problems"] else "✓"
+        filters = ", ".join(entry["equality"] + [f"{f} (range)" for f in entry["ranges"]]) or "-"
+        sort = ", ".join(f"{f} {d}" for f, d in entry["sort"]) or "-"
+        print(f"{status} {entry['collection']}.{entry['command_name']} x{entry['calls']} "
+              f"filtre: {filters} | tri: {sort}")
+        print(f"    plan: {'/'.join(entry['stages'])} | docs lus: {entry['docs_examined']} | "
+              f"clés lues: {entry['keys_examined']} | renvoyés: {entry['returned']}")
+        for problem in entry["problems"]:
+            print(f"    ✗ {problem}")
+        if entry["suggestion"]:
+            print(f"    💡 db.{entry['collection']}.create_index({entry['suggestion']})")
+        elif entry["covered"]:
+            print("    ℹ un index existant couvre cette forme, filtre peu sélectif sur ces données")
+        elif entry["problems"]:
+            print("    ℹ pas de filtre ni de tri indexable (scan complet attendu)")
+
+
+def run_advisor(paths: list[str], max_ratio: float = 10.0) -> list[dict]:
+    # The listener must be registered before the API creates its MongoClient
+    recorder = QueryShapeRecorder()
+    monitoring.register(recorder)
+    import app as api
+
+    client = api.app.test_client()
+    for path in paths:
+        response = client.get(path)
+        print(f"  GET {path} → {response.status_code}")
+    recorder.recording = False
+
+    print(f"\n🔍 {len(recorder.shapes)} formes de requêtes enregistrées\n")
+    report = analyze(api.db, recorder.shapes, max_ratio)
+    print_report(report)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Analyse les formes de requêtes de l'API et propose des index")
+    parser.add_argument("paths", nargs="*", help="requêtes GET à rejouer (défaut: jeu représentatif)")
+    parser.add_argument("--max-ratio", type=float, default=10.0,
+                        help="documents lus par document renvoyé au-delà duquel un plan est signalé")
+    args = parser.parse_args()
+
+    run_advisor(args.paths or DEFAULT_REQUESTS, args.max_ratio)
@@ -0,0 +1,348 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+API_DIR = Path(__file__).parent
+sys.path.append(str(API_DIR.parent))
+sys.path.append(str(API_DIR.parent / "pipeline"))
+sys.path.append(str(API_DIR))
+from bench import percentile
+
+MONGO_IMAGE = "mongo:8.0"
+PAYS = ['USA', 'Canada', 'UK', 'Germany', 'France', 'Australia', 'India', 'Brazil', 'Japan', 'China']
+STATUTS = ["livré", "en cours", "annulé"]
+
+# Dashboard-shaped traffic: name -> (weight, path template)
+DEFAULT_MIX = {
+    "kpi": (20, "/api/kpi"),
+    "statistics": (10, "/api/statistics"),
+    "status": (10, "/api/status"),
+    "clients": (15, "/api/clients?page={page}&limit=50"),
+    "clients_pays": (5, "/api/clients?pays={pays}&limit=50"),
+    "purchases": (10, "/api/purchases?page={page}&limit=50"),
+    "purchases_statut": (10, "/api/purchases?statut={statut}&limit=50"),
+    "client_detail": (15, "/api/clients/{client_id}"),
+    "client_search": (5, "/api/clients/search?q={prefix}"),
+    "sync_log": (5, "/api/sync-log"),
+    "timeseries": (5, "/api/timeseries?granularity={granularity}&points=300"),
+}
+
+SERVERS = {
+    "flask": lambda port, workers: [sys.executable, "-m", "flask", "--app", "app", "run",
+                                    "--port", str(port), "--with-threads"],
+    "wsgi": lambda port, workers: [sys.executable, str(API_DIR / "serve.py"), "--mode", "wsgi",
+                                   "--port", str(port), "--workers", str(workers)],
+    "asgi": lambda port, workers: [sys.executable, str(API_DIR / "serve.py"), "--mode", "asgi",
+                                   "--port", str(port), "--workers", str(workers)],
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until(check, timeout: float, what: str) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if check():
+                return
+        except Exception:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{what} indisponible après {timeout:.0f}s")
+
+
+def start_standin() -> tuple[str, callable]:
+    """Start a throwaway MongoDB (local mongod binary, else a docker container); return its URI and a stop function."""
+    from pymongo import MongoClient
+
+    port = free_port()
+    if shutil.which("mongod"):
+        dbpath = tempfile.mkdtemp(prefix="loadtest-mongo-")
+        process = subprocess.Popen(["mongod", "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1"],
+                                   stdout=subprocess.DEVNULL)
+
+        def stop():
+            process.terminate()
+            process.wait()
+            shutil.rmtree(dbpath, ignore_errors=True)
+    elif shutil.which("docker"):
+        container = subprocess.check_output(
+            ["docker", "run", "--rm", "-d", "-p", f"127.0.0.1:{port}:27017", MONGO_IMAGE]).decode().strip()
+
+        def stop():
+            subprocess.run(["docker", "stop", container], stdout=subprocess.DEVNULL)
+    else:
+        raise RuntimeError("Ni mongod ni docker disponibles : passer --mongo-uri")
+
+    uri = f"mongodb://127.0.0.1:{port}"
+    wait_until(lambda: MongoClient(uri, serverSelectionTimeoutMS=1000).admin.command("ping"), 60, "MongoDB")
+    print(f"🍃 MongoDB de test démarré sur {uri}")
+    return uri, stop
+
+
+def seed_database(uri: str, database: str, n_clients: int, n_achats: int) -> None:
+    """Fill ``database`` through the real pipeline: generated sources, silver cleaning, gold tables, MongoDB sync."""
+    import pandas as pd
+    from pymongo import MongoClient
+    from config import create_indexes, COLLECTION_KPI
+    from generate import generate_clients, generate_achats
+    from silver import clean_clients, clean_achats
+    from gold import build_gold_tables
+    from mongodb_sync import gold_loads, iter_frame, load_to_mongodb, stamp_kpi, build_client_views
+
+    started = time.time()
+    with tempfile.TemporaryDirectory(prefix="loadtest-data-") as workdir:
+        client_ids = generate_clients(n_clients, f"{workdir}/clients.csv")
+        generate_achats(client_ids, n_achats, f"{workdir}/achats.csv")
+        df_clients = clean_clients(pd.read_csv(f"{workdir}/clients.csv"))
+        df_achats = clean_achats(pd.read_csv(f"{workdir}/achats.csv"))
+    tables = build_gold_tables(df_clients, df_achats)
+
+    client = MongoClient(uri)
+    client.drop_database(database)
+    db = client[database]
+    create_indexes(db)
+    for collection_name, batches, key, extra_columns in gold_loads(lambda table: iter_frame(tables[table])):
+        log_entry = load_to_mongodb(db, collection_name, batches, key, extra_columns=extra_columns)
+        if collection_name == COLLECTION_KPI:
+            stamp_kpi(db, log_entry)
+    build_client_views(db)
+    client.close()
+    print(f"🌱 Base {database} remplie ({n_clients} clients, {n_achats} achats) en {time.time() - started:.1f}s")
+
+
+def start_server(server: str, port: int, workers: int, env: dict) -> subprocess.Popen:
+    process = subprocess.Popen(SERVERS[server](port, workers), cwd=API_DIR, env={**os.environ, **env},
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    wait_until(lambda: httpx.get(f"{url}/api/health", timeout=2).status_code == 200, 60, f"API ({server})")
+    print(f"🚀 API {server} démarrée sur {url}")
+    return process
+
+
+def parse_mix(spec: str | None) -> dict:
+    """``kpi=30,clients=10`` keeps only these entries of the default mix, with these weights."""
+    if not spec:
+        return DEFAULT_MIX
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Entrée inconnue dans --mix: {name} (disponibles: {', '.join(DEFAULT_MIX)})")
+        mix[name] = (float(weight or DEFAULT_MIX[name][0]), DEFAULT_MIX[name][1])
+    return mix
+
+
+class Traffic:
+    """Seeded random stream of (name, path) drawn from a weighted mix."""
+
+    def __init__(self, mix: dict, n_clients: int, seed: int):
+        self.names = list(mix)
+        self.weights = [weight for weight, _ in mix.values()]
+        self.templates = {name: template for name, (_, template) in mix.items()}
+        self.n_clients = n_clients
+        self.random = random.Random(seed)
+
+    def next(self) -> tuple[str, str]:
+        name = self.random.choices(self.names, self.weights)[0]
+        return name, self.templates[name].format(
+            page=self.random.randint(0, 9), pays=self.random.choice(PAYS), statut=self.random.choice(STATUTS),
+            client_id=self.random.randint(1, self.n_clients),
+            granularity=self.random.choice(["day", "week", "month"]),
+            prefix="".join(self.random.choices("abcdefghijklmnoprstw", k=3)),
+        )
+
+
+async def _request(client: httpx.AsyncClient, name: str, path: str, started: float, results: list) -> None:
+    try:
+        response = await client.get(path)
+        status = response.status_code
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    results.append((name, status, (time.perf_counter() - started) * 1000, time.perf_counter()))
+
+
+async def run_load(url: str, traffic: Traffic, duration: float, concurrency: int | None, rate: float | None,
+                   poisson: bool = False, no_cache: bool = False) -> tuple[list, float, float]:
+    """Replay traffic for ``duration`` seconds, closed-loop (``concurrency`` users) or open-loop (``rate`` req/s).
+
+    In open-loop mode latency runs from the scheduled send time, so server queueing is not hidden
+    by the generator waiting for responses.
+    """
+    headers = {"Cache-Control": "no-cache"} if no_cache else {}
+    limits = httpx.Limits(max_connections=concurrency or 1000, max_keepalive_connections=concurrency or 1000)
+    results = []
+    async with httpx.AsyncClient(base_url=url, headers=headers, limits=limits, timeout=30) as client:
+        start = time.perf_counter()
+        deadline = start + duration
+
+        if concurrency:
+            async def user():
+                while time.perf_counter() < deadline:
+                    name, path = traffic.next()
+                    await _request(client, name, path, time.perf_counter(), results)
+            await asyncio.gather(*(user() for _ in range(concurrency)))
+        else:
+            tasks, scheduled = [], start
+            while scheduled < deadline:
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                name, path = traffic.next()
+                tasks.append(asyncio.create_task(_request(client, name, path, scheduled, results)))
+                scheduled += traffic.random.expovariate(rate) if poisson else 1 / rate
+            await asyncio.gather(*tasks)
+    return results, start, time.perf_counter()
+
+
+def summarize(results: list, start: float, warmup: float) -> dict:
+    """Throughput, latency percentiles and error rate, overall and per endpoint, excluding warm-up."""
+    kept = [r for r in results if r[3] - start >= warmup]
+    elapsed = max((max(r[3] for r in kept) - start - warmup) if kept else 0, 1e-9)
+
+    def stats(rows):
+        latencies = [latency for _, status, latency, _ in rows if isinstance(status, int) and status < 400]
+        errors = {}
+        for _, status, _, _ in rows:
+            if not (isinstance(status, int) and status < 400):
+                errors[str(status)] = errors.get(str(status), 0) + 1
+        return {
+            "requests": len(rows),
+            "rps": round(len(latencies) / elapsed, 1),
+            "error_rate": round(sum(errors.values()) / len(rows) * 100, 2) if rows else 0.0,
+            "errors": errors,
+            **{f"p{p}": round(percentile(latencies, p), 2) for p in (50, 90, 99)},
+            "max": round(max(latencies), 2) if latencies else 0.0,
+        }
+
+    names = sorted({name for name, *_ in kept})
+    return {"total": stats(kept), "endpoints": {name: stats([r for r in kept if r[0] == name]) for name in names}}
+
+
+def print_report(report: dict) -> None:
+    print(f"\n{'endpoint':18} {'req':>7} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'erreurs':>8}")
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["total"])]
+    for name, s in rows:
+        print(f"{name:18} {s['requests']:>7} {s['rps']:>8.1f} {s['p50']:>8.1f} {s['p90']:>8.1f} "
+              f"{s['p99']:>8.1f} {s['max']:>8.1f} {s['error_rate']:>7.2f}%")
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions against a stored baseline: throughput down or p99 up by more than ``tolerance`` %, more errors."""
+    regressions = []
+    print(f"\n📏 Comparaison avec la référence du {baseline.get('created', '?')} (tolérance {tolerance:g}%)")
+    pairs = [("TOTAL", report["total"], baseline["total"])] + [
+        (name, stats, baseline["endpoints"][name])
+        for name, stats in report["endpoints"].items() if name in baseline.get("endpoints", {})
+    ]
+    for name, current, reference in pairs:
+        rps = (current["rps"] / reference["rps"] - 1) * 100 if reference["rps"] else 0.0
+        p99 = (current["p99"] / reference["p99"] - 1) * 100 if reference["p99"] else 0.0
+        errors = current["error_rate"] - reference["error_rate"]
+        problems = []
+        if rps < -tolerance:
+            problems.append(f"débit {rps:+.1f}%")
+        if p99 > tolerance:
+            problems.append(f"p99 {p99:+.1f}%")
+        if errors > 1:
+            problems.append(f"erreurs {errors:+.2f} pts")
+        status = "✗" if problems else "✓"
+        print(f"  {status} {name:18} débit {rps:+6.1f}%  p99 {p99:+6.1f}%  erreurs {errors:+.2f} pts")
+        regressions += [f"{name}: {problem}" for problem in problems]
+    return regressions
+
+
+def main(args) -> int:
+    mix = parse_mix(args.mix)
+    stops = []
+    try:
+        url = args.url
+        if not url:
+            uri = args.mongo_uri
+            if not uri:
+                uri, stop = start_standin()
+                stops.append(stop)
+            if not args.no_seed:
+                seed_database(uri, args.database, args.clients, args.achats)
+            port = free_port()
+            server = start_server(args.server, port, args.workers,
+                                  {"MONGODB_URI": uri, "MONGODB_DATABASE": args.database})
+            stops.append(lambda: (server.terminate(), server.wait()))
+            url = f"http://127.0.0.1:{port}"
+
+        load = f"{args.concurrency} utilisateurs" if args.concurrency else f"{args.rate:g} req/s"
+        print(f"📈 {args.duration:g}s de trafic ({load}, {len(mix)} types de requêtes) sur {url}")
+        traffic = Traffic(mix, args.clients, args.seed)
+        results, start, _ = asyncio.run(run_load(url, traffic, args.duration + args.warmup, args.concurrency,
+                                                 args.rate, args.poisson, args.no_cache))
+        report = summarize(results, start, args.warmup)
+        print_report(report)
+    finally:
+        for stop in reversed(stops):
+            stop()
+
+    report = {"created": datetime.utcnow().isoformat(), "config": {
+        "server": args.server if not args.url else args.url, "concurrency": args.concurrency, "rate": args.rate,
+        "duration": args.duration, "mix": {name: weight for name, (weight, _) in mix.items()},
+        "clients": args.clients, "achats": args.achats, "no_cache": args.no_cache,
+    }, **report}
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"\n💾 Référence enregistrée dans {args.save_baseline}")
+    if args.baseline:
+        regressions = compare(report, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} régression(s): " + "; ".join(regressions))
+            return 1
+        print("\n✅ Pas de régression")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test de charge de l'API sur une base MongoDB de test remplie par le pipeline")
+    target = parser.add_argument_group("cible")
+    target.add_argument("--url", help="API déjà démarrée (sinon: MongoDB de test + API lancées par le script)")
+    target.add_argument("--mongo-uri", help="MongoDB à utiliser au lieu d'en démarrer une (mongod local ou docker)")
+    target.add_argument("--database", default="loadtest")
+    target.add_argument("--no-seed", action="store_true", help="réutilise les données déjà présentes")
+    target.add_argument("--clients", type=int, default=10_000)
+    target.add_argument("--achats", type=int, default=100_000)
+    target.add_argument("--server", choices=list(SERVERS), default="flask")
+    target.add_argument("--workers", type=int, default=4, help="workers pour --server wsgi/asgi")
+
+    load = parser.add_argument_group("charge")
+    mode = load.add_mutually_exclusive_group()
+    mode.add_argument("--concurrency", type=int, help="boucle fermée: N utilisateurs enchaînant les requêtes")
+    mode.add_argument("--rate", type=float, help="boucle ouverte: requêtes par seconde à débit fixe")
+    load.add_argument("--poisson", action="store_true", help="arrivées de Poisson avec --rate")
+    load.add_argument("--duration", type=float, default=30)
+    load.add_argument("--warmup", type=float, default=5, help="secondes exclues du rapport")
+    load.add_argument("--mix", help=f"poids par requête, ex. kpi=30,clients=10 (défaut: {', '.join(DEFAULT_MIX)})")
+    load.add_argument("--no-cache", action="store_true", help="envoie Cache-Control: no-cache")
+    load.add_argument("--seed", type=int, default=42)
+
+    report = parser.add_argument_group("rapport")
+    report.add_argument("--save-baseline", metavar="FICHIER", help="enregistre le rapport comme référence (JSON)")
+    report.add_argument("--baseline", metavar="FICHIER", help="compare à une référence et sort en erreur si régression")
+    report.add_argument("--tolerance", type=float, default=10, help="écart toléré en %% sur le débit et le p99")
+
+    args = parser.parse_args()
+    if not args.concurrency and not args.rate:
+        args.concurrency = 50
+    sys.exit(main(args))
@@ -0,0 +1,169 @@
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+MONGODB_SLOW_QUERY_MS = float(os.getenv("MONGODB_SLOW_QUERY_MS", 100))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", 100))
+# Commands sent by the driver itself, not by the API code
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "buildInfo", "endSessions", "saslStart", "saslContinue"}
+
+_lock = threading.Lock()
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple):
+        self.name, self.help, self.labels = name, help_text, labels
+        self.values = {}
+
+    def inc(self, labels: tuple, amount: float = 1) -> None:
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.labels, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple, buckets: tuple):
+        self.name, self.help, self.labels, self.buckets = name, help_text, labels, buckets
+        self.values = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        with _lock:
+            entry = self.values.get(labels)
+            if entry is None:
+                entry = self.values[labels] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["counts"][i] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, entry in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, entry["counts"]):
+                lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), labels + (_number(bound),))} {count}")
+            lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), labels + ('+Inf',))} {entry['count']}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, labels)} {_number(entry['sum'])}")
+            lines.append(f"{self.name}_count{_labels(self.labels, labels)} {entry['count']}")
+        return lines
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+REQUEST_DURATION = Histogram("api_request_duration_seconds", "API request latency",
+                             ("method", "route"), LATENCY_BUCKETS)
+REQUESTS = Counter("api_requests_total", "API requests by status code", ("method", "route", "status"))
+RESPONSE_SIZE = Histogram("api_response_size_bytes", "API response body size (after compression)",
+                          ("route",), SIZE_BUCKETS)
+COMMAND_DURATION = Histogram("mongodb_command_duration_seconds", "MongoDB command latency",
+                             ("command", "collection"), LATENCY_BUCKETS)
+COMMAND_DOCUMENTS = Counter("mongodb_command_documents_returned_total", "Documents returned by MongoDB commands",
+                            ("command", "collection"))
+COMMAND_FAILURES = Counter("mongodb_command_failures_total", "Failed MongoDB commands", ("command", "collection"))
+SLOW_COMMANDS = Counter("mongodb_slow_commands_total",
+                        f"MongoDB commands slower than {MONGODB_SLOW_QUERY_MS:g} ms", ("command", "collection"))
+
+METRICS = [REQUEST_DURATION, REQUESTS, RESPONSE_SIZE, COMMAND_DURATION, COMMAND_DOCUMENTS, COMMAND_FAILURES,
+           SLOW_COMMANDS]
+
+slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float, size: int | None) -> None:
+    REQUEST_DURATION.observe((method, route), seconds)
+    REQUESTS.inc((method, route, str(status)))
+    if size is not None:
+        RESPONSE_SIZE.observe((route,), size)
+
+
+def _documents(command_name: str, reply: dict) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if command_name == "count":
+        return 1
+    return 0
+
+
+def _summary(command: dict) -> dict:
+    """The parts of a command worth logging (filter, sort, pipeline...), without driver fields."""
+    keys = ("filter", "sort", "projection", "pipeline", "query", "limit", "skip", "hint")
+    return {key: command[key] for key in keys if key in command}
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Time every MongoDB command sent by the API and log the slow ones."""
+
+    def __init__(self, slow_ms: float = MONGODB_SLOW_QUERY_MS):
+        self.slow_ms = slow_ms
+        self.pending = {}
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        if not isinstance(collection, str):
+            collection = ""
+        with _lock:
+            self.pending[(event.connection_id, event.request_id)] = (collection, _summary(event.command))
+
+    def succeeded(self, event):
+        with _lock:
+            pending = self.pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        collection, summary = pending
+        labels = (event.command_name, collection)
+        seconds = event.duration_micros / 1e6
+        COMMAND_DURATION.observe(labels, seconds)
+        COMMAND_DOCUMENTS.inc(labels, _documents(event.command_name, event.reply))
+
+        if seconds * 1000 >= self.slow_ms:
+            SLOW_COMMANDS.inc(labels)
+            entry = {"timestamp": datetime.utcnow().isoformat(), "command": event.command_name,
+                     "collection": collection, "duration_ms": round(seconds * 1000, 2), **summary}
+            slow_queries.append(entry)
+            print(f"🐢 Requête lente {event.command_name} {collection} {entry['duration_ms']} ms: {summary}")
+
+    def failed(self, event):
+        with _lock:
+            pending = self.pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        labels = (event.command_name, pending[0])
+        COMMAND_DURATION.observe(labels, event.duration_micros / 1e6)
+        COMMAND_FAILURES.inc(labels)
+
+
+def register() -> CommandMetrics:
+    """Register the command listener; must run before the MongoClient is created."""
+    listener = CommandMetrics()
+    monitoring.register(listener)
+    return listener
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
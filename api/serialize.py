@@ -0,0 +1,87 @@
+import gzip
+import json
+import os
+from datetime import date, datetime
+
+from flask.json.provider import JSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+API_COMPRESS_MIN_BYTES = int(os.getenv("API_COMPRESS_MIN_BYTES", 1024))
+API_GZIP_LEVEL = int(os.getenv("API_GZIP_LEVEL", 5))
+API_BROTLI_QUALITY = int(os.getenv("API_BROTLI_QUALITY", 4))
+
+# Preferred first; brotli only when the module is installed
+ENCODINGS = (["br"] if brotli else []) + ["gzip"]
+
+
+def _default(value):
+    # Same date format as Flask's default provider; ObjectId and the rest as strings
+    if isinstance(value, (datetime, date)):
+        return http_date(value)
+    return str(value)
+
+
+if orjson:
+    _OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+    def loads(data):
+        return orjson.loads(data)
+else:
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+    def loads(data):
+        return json.loads(data)
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider encoding straight to bytes with orjson (stdlib json when missing)."""
+
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs) -> str:
+        return dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = args[0] if len(args) == 1 else (args or kwargs or None)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+
+def negotiate_encoding(accept_encoding: str | None, size: int) -> str | None:
+    """Content-Encoding to use for a body of ``size`` bytes, or None to send it as is."""
+    if not accept_encoding or size < API_COMPRESS_MIN_BYTES:
+        return None
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = params.strip()[2:] if params.strip().startswith("q=") else "1"
+        try:
+            accepted[name.strip()] = float(quality)
+        except ValueError:
+            continue
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=API_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=API_GZIP_LEVEL, mtime=0)
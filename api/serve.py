@@ -0,0 +1,42 @@
+import argparse
+import importlib.util
+import os
+from pathlib import Path
+
+API_DIR = Path(__file__).parent
+
+
+def serve_asgi(host: str, port: int, workers: int) -> None:
+    import pymongo
+    import uvicorn
+
+    # asgi.py needs an async driver: AsyncMongoClient (pymongo >= 4.9) or motor
+    if not hasattr(pymongo, "AsyncMongoClient") and importlib.util.find_spec("motor") is None:
+        raise SystemExit(f"❌ Mode asgi : pymongo {pymongo.version} n'a pas AsyncMongoClient. "
+                         f"Installez pymongo>=4.9 (pip install -r requirements.txt) ou motor, ou lancez --mode wsgi")
+
+    print(f"🚀 Starting ASGI API (uvicorn, {workers} worker(s)) on http://{host}:{port}")
+    uvicorn.run("asgi:app", host=host, port=port, workers=workers, app_dir=str(API_DIR))
+
+
+def serve_wsgi(host: str, port: int, workers: int, threads: int) -> None:
+    # Each gunicorn worker opens its own MongoClient on first request (config.LazyDatabase)
+    print(f"🚀 Starting WSGI API (gunicorn, {workers} worker(s) x {threads} thread(s)) on http://{host}:{port}")
+    command = ["gunicorn", "-w", str(workers), "--threads", str(threads),
+               "-b", f"{host}:{port}", "--chdir", str(API_DIR), "app:app"]
+    os.execvp(command[0], command)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lance l'API en mode ASGI (async) ou WSGI (threads)")
+    parser.add_argument("--mode", choices=["asgi", "wsgi"], default="asgi")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads", type=int, default=8, help="threads par worker en mode wsgi")
+    args = parser.parse_args()
+
+    if args.mode == "asgi":
+        serve_asgi(args.host, args.port, args.workers)
+    else:
+        serve_wsgi(args.host, args.port, args.workers, args.threads)
@@ -0,0 +1,153 @@
+import os
+
+import numpy as np
+
+SOURCE = "agg_par_jour"
+GRANULARITIES = ["day", "week", "month"]
+METRICS = ["ca", "nb_achats"]
+DOWNSAMPLING = ["lttb", "minmax", "none"]
+TIMESERIES_DEFAULT_POINTS = int(os.getenv("TIMESERIES_DEFAULT_POINTS", 500))
+TIMESERIES_MAX_POINTS = int(os.getenv("TIMESERIES_MAX_POINTS", 5000))
+# Widest span of days filled with zeros before resampling (bounds memory and CPU per request)
+TIMESERIES_MAX_DAYS = int(os.getenv("TIMESERIES_MAX_DAYS", 20 * 366))
+
+
+def _choice(args, name: str, choices: list[str]) -> str:
+    value = args.get(name, choices[0])
+    if value not in choices:
+        raise ValueError(f"Invalid {name}: {value} (expected {'|'.join(choices)})")
+    return value
+
+
+def _date(args, name: str):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return np.datetime64(value, "D")
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value} (expected YYYY-MM-DD)")
+
+
+def _check_span(first, last) -> None:
+    if last - first + 1 > np.timedelta64(TIMESERIES_MAX_DAYS, "D"):
+        raise ValueError(f"Date range too wide: {first} to {last} (max {TIMESERIES_MAX_DAYS} days)")
+
+
+def parse_query(args) -> dict:
+    date_from, date_to = _date(args, "date_from"), _date(args, "date_to")
+    if date_from is not None and date_to is not None:
+        if date_from > date_to:
+            raise ValueError(f"date_from ({date_from}) is after date_to ({date_to})")
+        _check_span(date_from, date_to)
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "granularity": _choice(args, "granularity", GRANULARITIES),
+        "metric": _choice(args, "metric", METRICS),
+        "downsample": _choice(args, "downsample", DOWNSAMPLING),
+        "points": max(3, min(int(args.get("points", TIMESERIES_DEFAULT_POINTS)), TIMESERIES_MAX_POINTS)),
+    }
+
+
+def source_filter(query: dict) -> dict:
+    """Filter on agg_par_jour, whose dates are stored as YYYY-MM-DD strings."""
+    bounds = {}
+    if query["date_from"] is not None:
+        bounds["$gte"] = str(query["date_from"])
+    if query["date_to"] is not None:
+        bounds["$lte"] = str(query["date_to"])
+    return {"date": bounds} if bounds else {}
+
+
+def daily_series(rows: list[dict]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Dates, revenue and order counts per day, days without delivered orders filled with zeros.
+
+    The series spans the first to the last day present in ``rows``, never the (possibly open) requested bounds.
+    """
+    if not rows:
+        return np.array([], "datetime64[D]"), np.array([]), np.array([], np.int64)
+    dates = np.array([row["date"][:10] for row in rows], "datetime64[D]")
+    first, last = dates.min(), dates.max()
+    _check_span(first, last)
+    positions = (dates - first).astype(np.int64)
+    days = np.arange(first, last + 1)
+    ca = np.zeros(len(days))
+    counts = np.zeros(len(days), np.int64)
+    np.add.at(ca, positions, [row.get("ca") or 0 for row in rows])
+    np.add.at(counts, positions, [row.get("nb_achats") or 0 for row in rows])
+    return days, ca, counts
+
+
+def resample(days: np.ndarray, ca: np.ndarray, counts: np.ndarray, granularity: str):
+    """Sum days into ISO weeks (labelled by their Monday) or calendar months."""
+    if granularity == "day" or not len(days):
+        return [str(day) for day in days], ca, counts
+    if granularity == "week":
+        # datetime64 day 0 (1970-01-01) is a Thursday
+        periods = days - ((days.astype(np.int64) + 3) % 7)
+    else:
+        periods = days.astype("datetime64[M]")
+    labels, index = np.unique(periods, return_inverse=True)
+    return [str(label) for label in labels], np.bincount(index, ca), np.bincount(index, counts).astype(np.int64)
+
+
+def lttb(values: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of ``threshold`` points keeping the visual shape of the series."""
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = [0]
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        # Average of the next bucket (the last point for the final bucket)
+        avg_x, avg_y = x[next_start:next_end].mean(), values[next_start:next_end].mean()
+        prev = selected[-1]
+        areas = np.abs((x[prev] - avg_x) * (values[start:end] - values[prev])
+                       - (x[prev] - x[start:end]) * (avg_y - values[prev]))
+        selected.append(start + int(np.argmax(areas)))
+    selected.append(n - 1)
+    return np.array(selected)
+
+
+def minmax(values: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the minimum and maximum of each of ``threshold // 2`` buckets, in time order."""
+    n = len(values)
+    if threshold >= n:
+        return np.arange(n)
+    selected = set()
+    for bucket in np.array_split(np.arange(n), max(threshold // 2, 1)):
+        selected.update((bucket[np.argmin(values[bucket])], bucket[np.argmax(values[bucket])]))
+    return np.array(sorted(selected))
+
+
+def build_series(rows: list[dict], query: dict) -> dict:
+    """Revenue and order counts at the requested granularity, downsampled to at most ``points`` points.
+
+    ``downsample=none`` returns every point, up to ``TIMESERIES_MAX_POINTS``.
+    """
+    labels, ca, counts = resample(*daily_series(rows), query["granularity"])
+    values = ca if query["metric"] == "ca" else counts.astype(float)
+    if query["downsample"] == "lttb":
+        keep = lttb(values, query["points"])
+    elif query["downsample"] == "minmax":
+        keep = minmax(values, query["points"])
+    elif len(labels) > TIMESERIES_MAX_POINTS:
+        raise ValueError(f"{len(labels)} points without downsampling (max {TIMESERIES_MAX_POINTS}): "
+                         f"narrow the dates, use a coarser granularity or downsample=lttb|minmax")
+    else:
+        keep = np.arange(len(labels))
+    return {
+        "source": SOURCE,
+        "granularity": query["granularity"],
+        "downsample": query["downsample"],
+        "metric": query["metric"],
+        "source_points": len(labels),
+        "points": len(keep),
+        "data": [
+            {"date": labels[i], "ca": round(float(ca[i]), 2), "nb_achats": int(counts[i])} for i in keep
+        ],
+    }
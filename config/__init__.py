@@ -4,6 +4,8 @@ from .minio import (
     MINIO_ACCESS_KEY,
     MINIO_SECRET_KEY,
     MINIO_SECURE,
+    MINIO_CACHE_DIR,
+    MINIO_CACHE_MAX_BYTES,
     BUCKET_SOURCES,
     BUCKET_BRONZE,
     BUCKET_SILVER,
@@ -16,7 +18,10 @@ from .minio import (
 from .mongodb import (
     get_mongodb_client,
     get_mongodb_database,
+    LazyDatabase,
     create_indexes,
+    create_collection_indexes,
+    INDEXES,
     log_sync,
     clear_collection,
     MONGODB_HOST,
@@ -24,8 +29,45 @@ from .mongodb import (
     MONGODB_USER,
     MONGODB_PASSWORD,
     MONGODB_DATABASE,
+    MONGODB_URI,
+    MONGODB_BATCH_SIZE,
+    MONGODB_WRITE_WORKERS,
+    MONGODB_SYNC_MODE,
+    MONGODB_KEEP_GENERATIONS,
+    MONGODB_COMPACT_SCHEMA,
     COLLECTION_CLIENTS,
     COLLECTION_ACHATS,
     COLLECTION_KPI,
     COLLECTION_SYNC_LOG,
+    COLLECTION_CLIENT_SUMMARY,
+    COLLECTION_ACHATS_BUCKETS,
+    COLLECTION_DIM_PRODUITS,
+    COLLECTION_DIM_PAYS,
+    COLLECTION_CLIENT_SEARCH,
+    HASH_FIELD,
+    GOLD_AGGREGATES,
+)
+
+from .schema import (
+    is_compact,
+    stored_field,
+    stored_value,
+    api_value,
+    encode_sort,
+    encode_document,
+    decode_document,
+    encode_query,
+    decode_stages,
+    compact_document,
+    compact_index_keys,
+    COMPACT_FIELDS,
+)
+
+from .search import (
+    search_keys,
+    query_tokens,
+    search_filters,
+    rank_matches,
+    SEARCH_PREFIX_MIN,
+    SEARCH_PREFIX_MAX,
 )
@@ -15,6 +15,9 @@ SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", "./data/database/analytics.db")
 
 PREFECT_API_URL = os.getenv("PREFECT_API_URL", "http://localhost:4200/api")
 
+MINIO_CACHE_DIR = Path(os.getenv("MINIO_CACHE_DIR", Path(__file__).parent.parent / "data" / "cache"))
+MINIO_CACHE_MAX_BYTES = int(os.getenv("MINIO_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+
 BUCKET_SOURCES = "sources"
 BUCKET_BRONZE = "bronze"
 BUCKET_SILVER = "silver"
@@ -3,6 +3,7 @@ from pymongo import MongoClient
 from pymongo.server_api import ServerApi
 from dotenv import load_dotenv
 from datetime import datetime
+import threading
 import time
 
 load_dotenv()
@@ -13,15 +14,43 @@ MONGODB_USER = os.getenv("MONGODB_USER", "admin")
 MONGODB_PASSWORD = os.getenv("MONGODB_PASSWORD", "admin123")
 MONGODB_DATABASE = os.getenv("MONGODB_DATABASE", "analytics")
 
+MONGODB_BATCH_SIZE = int(os.getenv("MONGODB_BATCH_SIZE", 5000))
+MONGODB_WRITE_WORKERS = int(os.getenv("MONGODB_WRITE_WORKERS", 4))
+MONGODB_SYNC_MODE = os.getenv("MONGODB_SYNC_MODE", "diff")
+MONGODB_KEEP_GENERATIONS = int(os.getenv("MONGODB_KEEP_GENERATIONS", 2))
+# Compact typed documents for clients and achats (see config/schema.py)
+MONGODB_COMPACT_SCHEMA = os.getenv("MONGODB_COMPACT_SCHEMA", "false").lower() in ("1", "true", "yes")
+
 COLLECTION_CLIENTS = "clients"
 COLLECTION_ACHATS = "achats"
 COLLECTION_KPI = "kpi"
 COLLECTION_SYNC_LOG = "sync_log"
+COLLECTION_CLIENT_SUMMARY = "client_summary"
+COLLECTION_ACHATS_BUCKETS = "achats_par_client_mois"
+COLLECTION_DIM_PRODUITS = "dim_produits"
+COLLECTION_DIM_PAYS = "dim_pays"
+COLLECTION_CLIENT_SEARCH = "client_search"
+
+HASH_FIELD = "_row_hash"
+
+# Gold aggregate tables materialized as collections of the same name
+GOLD_AGGREGATES = {
+    "ca_par_pays": {"key": "pays", "sort": [("ca_total", -1)]},
+    "ca_par_categorie": {"key": "categorie", "sort": [("ca_total", -1)]},
+    "agg_par_jour": {"key": "date", "sort": [("date", 1)]},
+    "agg_par_mois": {"key": "mois", "sort": [("mois", 1)]},
+    "agg_par_annee": {"key": "annee", "sort": [("annee", 1)]},
+    "distribution_statut": {"key": "statut", "sort": [("count", -1)]},
+    "distribution_paiement": {"key": "mode_paiement", "sort": [("count", -1)]},
+}
+
+
+# MONGODB_URI overrides the URI built from the settings above (e.g. a local MongoDB without auth)
+MONGODB_URI = os.getenv("MONGODB_URI") or f"mongodb://{MONGODB_USER}:{MONGODB_PASSWORD}@{MONGODB_HOST}:{MONGODB_PORT}/{MONGODB_DATABASE}?authSource=admin"
 
 
 def get_mongodb_client():
-    connection_string = f"mongodb://{MONGODB_USER}:{MONGODB_PASSWORD}@{MONGODB_HOST}:{MONGODB_PORT}/{MONGODB_DATABASE}?authSource=admin"
-    client = MongoClient(connection_string, serverSelectionTimeoutMS=5000)
+    client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000)
     try:
         client.admin.command('ping')
         print(f"✓ Connected to MongoDB at {MONGODB_HOST}:{MONGODB_PORT}")
@@ -37,35 +66,106 @@ def get_mongodb_database(client=None):
     return client[MONGODB_DATABASE]
 
 
-def create_indexes(db):
-    try:
-        db[COLLECTION_CLIENTS].create_index("client_id", unique=True)
-        db[COLLECTION_CLIENTS].create_index("pays")
-        db[COLLECTION_CLIENTS].create_index("date_inscription")
-
-        db[COLLECTION_ACHATS].create_index("achat_id", unique=True)
-        db[COLLECTION_ACHATS].create_index("client_id")
-        db[COLLECTION_ACHATS].create_index("date_achat")
-        db[COLLECTION_ACHATS].create_index("statut")
-        db[COLLECTION_ACHATS].create_index("montant_total")
+class LazyDatabase:
+    """Database handle connected on first use and reconnected in every new process.
+
+    MongoClient is not fork-safe: a handle created before a pre-fork server
+    forks its workers must not be reused by them.
+    """
+
+    def __init__(self):
+        self._pid = None
+        self._database = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._database = get_mongodb_database(get_mongodb_client())
+                    self._pid = os.getpid()
+        return self._database
+
+    def __getitem__(self, name):
+        return self.get()[name]
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+# Compound indexes follow the API query shapes (equality, then sort, then range);
+# they also serve queries on their leading field alone
+INDEXES = {
+    COLLECTION_CLIENTS: [
+        ("client_id", {"unique": True}),
+        ([("pays", 1), ("client_id", 1)], {}),
+        ("date_inscription", {}),
+    ],
+    COLLECTION_ACHATS: [
+        ("achat_id", {"unique": True}),
+        ([("client_id", 1), ("date_achat", 1)], {}),
+        ([("statut", 1), ("montant_total", 1), ("_id", 1)], {}),
+        # _id breaks ties for keyset pagination on non-unique sort keys
+        ([("date_achat", 1), ("_id", 1)], {}),
+        # Purchases filtered on statut, sorted by date (the dashboard default), without an in-memory sort
+        ([("statut", 1), ("date_achat", 1), ("_id", 1)], {}),
+        ([("montant_total", 1), ("_id", 1)], {}),
+    ],
+    COLLECTION_KPI: [
+        ("date_update", {}),
+    ],
+    COLLECTION_SYNC_LOG: [
+        ("timestamp", {}),
+    ],
+    COLLECTION_CLIENT_SUMMARY: [
+        ("client_id", {"unique": True}),
+    ],
+    COLLECTION_ACHATS_BUCKETS: [
+        ([("client_id", 1), ("mois", -1)], {"unique": True}),
+    ],
+    COLLECTION_DIM_PRODUITS: [
+        ("produit_id", {"unique": True}),
+    ],
+    COLLECTION_DIM_PAYS: [
+        ("pays_id", {"unique": True}),
+    ],
+    COLLECTION_CLIENT_SEARCH: [
+        ("client_id", {"unique": True}),
+        # Multikey: one entry per prefix of every name / email token
+        ("keys", {}),
+    ],
+}
+for _name, _spec in GOLD_AGGREGATES.items():
+    INDEXES[_name] = [(_spec["key"], {"unique": True})]
+    if _spec["sort"][0][0] != _spec["key"]:
+        INDEXES[_name].append((_spec["sort"], {}))
+
+
+def create_collection_indexes(db, collection_name, target=None):
+    from .schema import index_keys
+
+    for keys, options in INDEXES.get(collection_name, []):
+        db[target or collection_name].create_index(index_keys(collection_name, keys), **options)
 
-        db[COLLECTION_KPI].create_index("date_update")
 
-        db[COLLECTION_SYNC_LOG].create_index("timestamp")
-        
+def create_indexes(db):
+    try:
+        for collection_name in INDEXES:
+            create_collection_indexes(db, collection_name)
         print("✓ MongoDB indexes created")
     except Exception as e:
         print(f"✗ Index creation error: {e}")
 
 
-def log_sync(db, collection_name, status, row_count, duration_seconds):
+def log_sync(db, collection_name, status, row_count, duration_seconds, **extra):
     log_entry = {
         "timestamp": datetime.utcnow(),
         "collection": collection_name,
         "status": status,
         "row_count": row_count,
         "duration_seconds": round(duration_seconds, 3),
-        "documents_per_second": round(row_count / duration_seconds, 2) if duration_seconds > 0 else 0
+        "documents_per_second": round(row_count / duration_seconds, 2) if duration_seconds > 0 else 0,
+        **extra
     }
     db[COLLECTION_SYNC_LOG].insert_one(log_entry)
     return log_entry
@@ -0,0 +1,227 @@
+import math
+from datetime import date, datetime
+
+from .mongodb import (
+    MONGODB_COMPACT_SCHEMA,
+    COLLECTION_CLIENTS, COLLECTION_ACHATS, COLLECTION_DIM_PRODUITS, COLLECTION_DIM_PAYS,
+    HASH_FIELD,
+)
+
+# Stored field name of each API field in the compact schema
+COMPACT_FIELDS = {
+    COLLECTION_ACHATS: {
+        "achat_id": "a", "client_id": "c", "produit_id": "p", "pays_id": "py", "quantite": "q",
+        "prix_unitaire": "pu", "montant_total": "m", "date_achat": "d", "statut": "s", "mode_paiement": "mp",
+    },
+    COLLECTION_CLIENTS: {
+        "client_id": "c", "nom": "n", "email": "e", "pays_id": "py", "date_inscription": "di",
+    },
+}
+
+# Small integer codes: the position in the list is the stored value, so only append
+CODES = {
+    "statut": ["livré", "en cours", "annulé"],
+    "mode_paiement": ["carte", "paypal", "virement"],
+}
+CENTS_FIELDS = {"prix_unitaire", "montant_total"}
+DATE_FIELDS = {"date_achat", "date_inscription"}
+
+# Strings not stored in the compact schema, resolved from a dimension collection: field -> (dimension, reference)
+DIMENSION_FIELDS = {
+    "produit": (COLLECTION_DIM_PRODUITS, "produit_id"),
+    "categorie": (COLLECTION_DIM_PRODUITS, "produit_id"),
+    "pays": (COLLECTION_DIM_PAYS, "pays_id"),
+}
+COMPACT_DIMENSIONS = {
+    COLLECTION_ACHATS: ["produit", "categorie"],
+    COLLECTION_CLIENTS: ["pays"],
+}
+
+_code_of = {field: {value: code for code, value in enumerate(values)} for field, values in CODES.items()}
+_dimensions = {}
+
+
+def is_compact(collection: str) -> bool:
+    return MONGODB_COMPACT_SCHEMA and collection in COMPACT_FIELDS
+
+
+def _missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def encode_value(field: str, value):
+    if _missing(value):
+        return value
+    if field in CENTS_FIELDS:
+        return int(round(value * 100))
+    if field in DATE_FIELDS:
+        if isinstance(value, str):
+            return datetime.strptime(value[:10], "%Y-%m-%d")
+        if isinstance(value, date) and not isinstance(value, datetime):
+            return datetime(value.year, value.month, value.day)
+        return value
+    if field in CODES:
+        return _code_of[field].get(value, value)
+    return value
+
+
+def decode_value(field: str, value):
+    if _missing(value) or isinstance(value, bool):
+        return value
+    if field in CENTS_FIELDS and isinstance(value, int):
+        return value / 100
+    if field in DATE_FIELDS and isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    if field in CODES and isinstance(value, int) and 0 <= value < len(CODES[field]):
+        return CODES[field][value]
+    return value
+
+
+def _stored_field(collection: str, field: str) -> str:
+    if field in COMPACT_DIMENSIONS.get(collection, []):
+        field = DIMENSION_FIELDS[field][1]
+    return COMPACT_FIELDS[collection].get(field, field)
+
+
+def stored_field(collection: str, field: str) -> str:
+    return _stored_field(collection, field) if is_compact(collection) else field
+
+
+def stored_value(collection: str, field: str, value):
+    return encode_value(field, value) if is_compact(collection) else value
+
+
+def api_value(collection: str, field: str, value):
+    return decode_value(field, value) if is_compact(collection) else value
+
+
+def encode_sort(collection: str, keys: list) -> list:
+    return [(stored_field(collection, field), direction) for field, direction in keys]
+
+
+def compact_index_keys(collection: str, keys):
+    if isinstance(keys, str):
+        return _stored_field(collection, keys)
+    return [(_stored_field(collection, field), direction) for field, direction in keys]
+
+
+def index_keys(collection: str, keys):
+    return compact_index_keys(collection, keys) if is_compact(collection) else keys
+
+
+def compact_document(collection: str, doc: dict) -> dict:
+    dimensions = COMPACT_DIMENSIONS[collection]
+    return {
+        _stored_field(collection, field): encode_value(field, value)
+        for field, value in doc.items() if field not in dimensions
+    }
+
+
+def encode_document(collection: str, doc: dict) -> dict:
+    """Translate an API-shaped document to the stored schema (identity unless compact)."""
+    return compact_document(collection, doc) if is_compact(collection) else doc
+
+
+def _dimension(db, name: str, refresh: bool = False) -> dict:
+    if refresh or name not in _dimensions:
+        reference = next(ref for dim, ref in DIMENSION_FIELDS.values() if dim == name)
+        _dimensions[name] = {
+            doc[reference]: doc for doc in db[name].find({}, {"_id": 0, HASH_FIELD: 0}) if reference in doc
+        }
+    return _dimensions[name]
+
+
+def _dimension_row(db, name: str, ref_value) -> dict | None:
+    row = _dimension(db, name).get(ref_value)
+    if row is None:
+        # A sync may have added dimension rows since the cache was filled
+        row = _dimension(db, name, refresh=True).get(ref_value)
+    return row
+
+
+def decode_document(db, collection: str, doc: dict | None) -> dict | None:
+    """Translate a stored document back to the API shape (identity unless compact)."""
+    if doc is None or not is_compact(collection):
+        return doc
+    names = {short: field for field, short in COMPACT_FIELDS[collection].items()}
+    decoded = {names.get(key, key): decode_value(names.get(key, key), value) for key, value in doc.items()}
+    for field in COMPACT_DIMENSIONS[collection]:
+        name, reference = DIMENSION_FIELDS[field]
+        if reference in decoded:
+            row = _dimension_row(db, name, decoded[reference])
+            decoded[field] = row.get(field) if row else None
+    return decoded
+
+
+def _dimension_ids(db, field: str, value) -> list:
+    name, reference = DIMENSION_FIELDS[field]
+    if isinstance(value, dict):
+        if set(value) - {"$eq", "$in"}:
+            raise ValueError(f"Opérateur non supporté sur {field} en schéma compact: {list(value)}")
+        wanted = set(value.get("$in", [])) | ({value["$eq"]} if "$eq" in value else set())
+    else:
+        wanted = {value}
+    ids = [ref for ref, row in _dimension(db, name).items() if row.get(field) in wanted]
+    if not ids:
+        ids = [ref for ref, row in _dimension(db, name, refresh=True).items() if row.get(field) in wanted]
+    return ids
+
+
+def _encode_condition(field: str, condition):
+    if isinstance(condition, dict):
+        return {
+            op: [encode_value(field, v) for v in operand] if isinstance(operand, list) else encode_value(field, operand)
+            for op, operand in condition.items()
+        }
+    return encode_value(field, condition)
+
+
+def encode_query(db, collection: str, query: dict) -> dict:
+    """Translate a filter on API fields to the stored schema, resolving dimension strings to ids."""
+    if not is_compact(collection):
+        return query
+    encoded = {}
+    for field, condition in query.items():
+        if field in COMPACT_DIMENSIONS[collection]:
+            encoded[_stored_field(collection, field)] = {"$in": _dimension_ids(db, field, condition)}
+        else:
+            encoded[_stored_field(collection, field)] = _encode_condition(field, condition)
+    return encoded
+
+
+def _decode_expression(field: str, expression):
+    if field in CENTS_FIELDS:
+        return {"$divide": [expression, 100]}
+    if field in DATE_FIELDS:
+        return {"$dateToString": {"format": "%Y-%m-%d", "date": expression}}
+    if field in CODES:
+        return {"$arrayElemAt": [CODES[field], expression]}
+    return expression
+
+
+def decode_stages(collection: str, fields: list[str] | None = None) -> list[dict]:
+    """Aggregation stages rebuilding API-shaped ``fields`` from compact documents.
+
+    Prepend them to a pipeline written against API field names; empty unless compact.
+    """
+    if not is_compact(collection):
+        return []
+    mapping = COMPACT_FIELDS[collection]
+    dimensions = COMPACT_DIMENSIONS[collection]
+    fields = fields or list(mapping) + dimensions
+
+    stages, computed, lookups = [], {}, {}
+    for field in fields:
+        if field in dimensions:
+            name, reference = DIMENSION_FIELDS[field]
+            lookups[name] = reference
+            computed[field] = {"$arrayElemAt": [f"$_{name}.{field}", 0]}
+        elif field in mapping:
+            computed[field] = _decode_expression(field, f"${mapping[field]}")
+
+    for name, reference in lookups.items():
+        stages.append({"$lookup": {"from": name, "localField": mapping[reference],
+                                   "foreignField": reference, "as": f"_{name}"}})
+    stages.append({"$addFields": computed})
+    stages.append({"$project": {**{short: 0 for short in mapping.values()}, **{f"_{name}": 0 for name in lookups}}})
+    return stages
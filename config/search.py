@@ -0,0 +1,76 @@
+import os
+import re
+import unicodedata
+
+# Prefixes indexed per token: shorter query tokens only match whole words,
+# longer ones are truncated (and re-checked when ranking)
+SEARCH_PREFIX_MIN = int(os.getenv("SEARCH_PREFIX_MIN", 2))
+SEARCH_PREFIX_MAX = int(os.getenv("SEARCH_PREFIX_MAX", 12))
+SEARCH_MAX_TOKENS = 5
+# Marks a whole-word key ("=walker") next to its prefixes ("wa", "wal"...)
+EXACT = "="
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text) -> str:
+    """Lowercase without accents: "Élodie" -> "elodie"."""
+    decomposed = unicodedata.normalize("NFKD", str(text or ""))
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def tokens(text) -> list[str]:
+    return _TOKEN.findall(normalize(text))
+
+
+def search_keys(*texts) -> tuple:
+    """Index keys of a document: every whole token plus its prefixes, for all ``texts`` (name, email...)."""
+    keys = set()
+    for token in (token for text in texts for token in tokens(text)):
+        keys.add(EXACT + token)
+        keys.update(token[:length] for length in range(SEARCH_PREFIX_MIN, min(len(token), SEARCH_PREFIX_MAX) + 1))
+    # A tuple so pandas can hash the row; BSON stores it as an array
+    return tuple(sorted(keys))
+
+
+def query_tokens(q: str | None) -> list[str]:
+    found = list(dict.fromkeys(tokens(q)))[:SEARCH_MAX_TOKENS]
+    if not found:
+        raise ValueError("q must contain at least one letter or digit")
+    return found
+
+
+def search_filters(query: list[str], field: str = "keys") -> tuple[dict, dict]:
+    """(whole-word filter, prefix filter) on the keys array; the longest token first drives the index scan."""
+    ordered = sorted(query, key=len, reverse=True)
+    exact = [EXACT + token for token in ordered]
+    prefixes = [token[:SEARCH_PREFIX_MAX] if len(token) >= SEARCH_PREFIX_MIN else EXACT + token for token in ordered]
+    return {field: {"$all": exact}}, {field: {"$all": prefixes}}
+
+
+def _score(doc: dict, query: list[str]) -> tuple:
+    name = tokens(doc.get("nom"))
+    words = name + tokens(doc.get("email"))
+    if all(token in name for token in query):
+        quality = 0
+    elif all(any(word.startswith(token) for word in name) for token in query):
+        quality = 1
+    elif all(token in words for token in query):
+        quality = 2
+    else:
+        quality = 3
+    starts = not (name and name[0].startswith(query[0]))
+    return quality, starts, len(doc.get("nom") or ""), doc.get("client_id", 0)
+
+
+def rank_matches(docs: list[dict], query: list[str], limit: int) -> list[dict]:
+    """Best ``limit`` matches: whole words in the name, then name prefixes, then email; shorter names first.
+
+    Candidates matched on a truncated prefix are checked against the full query tokens.
+    """
+    unique = {}
+    for doc in docs:
+        words = tokens(doc.get("nom")) + tokens(doc.get("email"))
+        if all(any(word.startswith(token) for word in words) for token in query):
+            unique.setdefault(doc.get("client_id"), doc)
+    return sorted(unique.values(), key=lambda doc: _score(doc, query))[:limit]
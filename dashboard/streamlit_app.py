@@ -3,7 +3,10 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import requests
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import threading
 import time
 
 st.set_page_config(
@@ -224,68 +227,193 @@ CHART_TEMPLATE = {
     }
 }
 
-@st.cache_data(ttl=300)
-def fetch_status():
-    try:
-        response = requests.get(f"{API_URL}/status", timeout=5)
-        if response.status_code == 200:
-            return response.json()
-    except:
-        pass
-    return None
-
-@st.cache_data(ttl=60)
-def fetch_kpi():
-    try:
-        response = requests.get(f"{API_URL}/kpi", timeout=5)
-        if response.status_code == 200:
-            return response.json()
-    except:
-        pass
-    return None
-
-@st.cache_data(ttl=60)
-def fetch_statistics():
-    try:
-        response = requests.get(f"{API_URL}/statistics", timeout=5)
-        if response.status_code == 200:
-            return response.json()
-    except:
-        pass
-    return None
-
-@st.cache_data(ttl=300)
-def fetch_clients(page=0, limit=100):
-    try:
-        response = requests.get(f"{API_URL}/clients", params={"page": page, "limit": limit}, timeout=5)
-        if response.status_code == 200:
-            return response.json()
-    except:
-        pass
-    return None
-
-@st.cache_data(ttl=300)
-def fetch_purchases(page=0, limit=100, statut=None):
+FETCH_WORKERS = 8
+# Bounds the page cache too: at most this many pages (of up to 250 rows) are kept
+RESPONSE_CACHE_ENTRIES = 128
+PAGE_SIZES = [50, 100, 250]
+# Paged tables: filters and sort are sent to the API, pages are read with its keyset cursor
+TABLES = {
+    "clients": {"path": "/clients", "sorts": ["client_id", "-client_id"], "filters": ["pays"]},
+    "purchases": {
+        "path": "/purchases",
+        "sorts": ["-date_achat", "date_achat", "-montant_total", "montant_total", "achat_id", "-achat_id"],
+        "filters": ["statut", "min_amount"],
+    },
+}
+
+
+@st.cache_resource
+def get_session():
+    """Keep-alive connection pool shared by every rerun and session."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=FETCH_WORKERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_resource
+def get_executor():
+    return ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+
+@st.cache_resource
+def get_response_cache():
+    """API responses of the current sync generation (``last_sync`` of /status)."""
+    return {"generation": None, "entries": OrderedDict(), "lock": threading.Lock()}
+
+def set_generation(generation):
+    cache = get_response_cache()
+    with cache["lock"]:
+        if cache["generation"] != generation:
+            cache["entries"].clear()
+            cache["generation"] = generation
+
+def api_get(path, params=None):
+    response = get_session().get(f"{API_URL}{path}", params=params, timeout=5)
+    response.raise_for_status()
+    return response.json()
+
+def cached_get(generation, path, params=None):
+    """GET an API path, cached until the next sync; errors are not cached."""
+    cache = get_response_cache()
+    key = (path, tuple(sorted((params or {}).items())))
+    with cache["lock"]:
+        if cache["generation"] == generation and key in cache["entries"]:
+            cache["entries"].move_to_end(key)
+            return cache["entries"][key]
     try:
-        params = {"page": page, "limit": limit}
-        if statut:
-            params["statut"] = statut
-        response = requests.get(f"{API_URL}/purchases", params=params, timeout=5)
-        if response.status_code == 200:
-            return response.json()
-    except:
-        pass
-    return None
-
-@st.cache_data(ttl=600)
-def fetch_sync_logs(days=7):
+        data = api_get(path, params)
+    except Exception:
+        return None
+    with cache["lock"]:
+        # A fetch started before a newer sync was seen is not kept
+        if cache["generation"] == generation:
+            cache["entries"][key] = data
+            while len(cache["entries"]) > RESPONSE_CACHE_ENTRIES:
+                cache["entries"].popitem(last=False)
+    return data
+
+def fetch_status():
+    # Never cached: its last_sync is the generation every other response is cached under
     try:
-        response = requests.get(f"{API_URL}/sync-log", params={"days": days}, timeout=5)
-        if response.status_code == 200:
-            return response.json()
-    except:
-        pass
-    return None
+        return api_get("/status")
+    except Exception:
+        return None
+
+def fetch_kpi(generation):
+    return cached_get(generation, "/kpi")
+
+def fetch_statistics(generation):
+    return cached_get(generation, "/statistics")
+
+def fetch_page(generation, path, params, cursor=None):
+    return cached_get(generation, path, {**params, "cursor": cursor} if cursor else params)
+
+def fetch_timeseries(generation, granularity="day", points=300):
+    return cached_get(generation, "/timeseries", {"granularity": granularity, "points": points, "downsample": "lttb"})
+
+def fetch_sync_logs(generation, days=7):
+    return cached_get(generation, "/sync-log", {"days": days})
+
+def table_params(name):
+    """API parameters of a paged table (page size, sort, filters) from its widgets."""
+    spec = TABLES[name]
+    params = {
+        "limit": st.session_state.get(f"{name}_size", PAGE_SIZES[0]),
+        "sort": st.session_state.get(f"{name}_sort", spec["sorts"][0]),
+    }
+    for field in spec["filters"]:
+        value = st.session_state.get(f"{name}_{field}")
+        if value not in (None, "", "All", 0):
+            params[field] = value
+    return params
+
+def current_cursor(name):
+    return st.session_state[f"{name}_cursors"][st.session_state[f"{name}_page"]]
+
+def reset_pages(name):
+    st.session_state[f"{name}_page"] = 0
+    st.session_state[f"{name}_cursors"] = [None]
+
+def next_page(name, token):
+    page = st.session_state[f"{name}_page"] + 1
+    cursors = st.session_state[f"{name}_cursors"]
+    del cursors[page:]
+    cursors.append(token)
+    st.session_state[f"{name}_page"] = page
+
+def previous_page(name):
+    st.session_state[f"{name}_page"] = max(st.session_state[f"{name}_page"] - 1, 0)
+
+def dashboard_requests(granularity):
+    requests_by_name = {
+        "kpi": (fetch_kpi, {}),
+        "stats": (fetch_statistics, {}),
+        "timeseries": (fetch_timeseries, {"granularity": granularity}),
+        "sync_logs": (fetch_sync_logs, {"days": 7}),
+    }
+    for name, spec in TABLES.items():
+        requests_by_name[name] = (fetch_page, {"path": spec["path"], "params": table_params(name),
+                                               "cursor": current_cursor(name)})
+    return requests_by_name
+
+def fetch_dashboard(granularity):
+    """Fetch everything the page shows concurrently, so first paint waits for the slowest call, not the sum.
+
+    The data requests start with the last generation seen, alongside /status; they are
+    only sent again when /status reports a new sync. The page after each table's
+    current one is then prefetched in the background.
+    """
+    executor = get_executor()
+    status_future = executor.submit(fetch_status)
+    generation = get_response_cache()["generation"]
+    requests_by_name = dashboard_requests(granularity)
+
+    def submit(generation):
+        return {
+            name: executor.submit(fetch, generation, **kwargs)
+            for name, (fetch, kwargs) in requests_by_name.items()
+        }
+
+    futures = submit(generation) if generation else None
+    status = status_future.result()
+    latest = status.get("last_sync") if status else None
+    if futures is None or latest != generation:
+        set_generation(latest)
+        futures = submit(latest)
+    data = {name: future.result() for name, future in futures.items()}
+
+    for name, spec in TABLES.items():
+        if data[name] and data[name].get("next"):
+            executor.submit(fetch_page, latest, spec["path"], requests_by_name[name][1]["params"], data[name]["next"])
+    return status, data
+
+def render_page(name, result, columns, height=350):
+    """One page of a paged table with Previous / Next controls; only this page is held by the browser."""
+    if not result:
+        st.caption("No data")
+        return
+    df = pd.DataFrame(result.get("data", []))
+    cols_available = [c for c in columns if c in df.columns]
+    st.dataframe(df[cols_available] if cols_available else df, use_container_width=True, height=height, hide_index=True)
+
+    page = st.session_state[f"{name}_page"]
+    total, limit = result.get("total"), result.get("limit") or PAGE_SIZES[0]
+    col_prev, col_info, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        st.button("Previous", key=f"{name}_previous", disabled=page == 0, on_click=previous_page, args=(name,))
+    with col_info:
+        pages = f" of {max(-(-total // limit), 1):,} ({total:,} rows)" if total is not None else ""
+        st.caption(f"Page {page + 1:,}{pages}")
+    with col_next:
+        st.button("Next", key=f"{name}_next", disabled=not result.get("next"), on_click=next_page,
+                  args=(name, result.get("next")))
+
+def sort_label(sort):
+    return f"{sort.lstrip('-')} {'desc' if sort.startswith('-') else 'asc'}"
+
+for _name in TABLES:
+    st.session_state.setdefault(f"{_name}_page", 0)
+    st.session_state.setdefault(f"{_name}_cursors", [None])
 
 st.markdown("""
 <div class="main-header">
@@ -294,7 +422,7 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-api_status = fetch_status()
+api_status, data = fetch_dashboard(granularity=st.session_state.get("granularity", "day"))
 col_status, col_refresh = st.columns([3, 1])
 
 with col_status:
@@ -305,12 +433,12 @@ with col_status:
 
 with col_refresh:
     if st.button("Refresh"):
-        st.cache_data.clear()
+        set_generation(None)
         st.rerun()
 
 st.markdown("<br>", unsafe_allow_html=True)
 
-kpi_data = fetch_kpi()
+kpi_data = data["kpi"]
 if kpi_data:
     col1, col2, col3, col4, col5 = st.columns(5)
 
@@ -356,7 +484,7 @@ if kpi_data:
 
 st.markdown("<br>", unsafe_allow_html=True)
 
-stats = fetch_statistics()
+stats = data["stats"]
 if stats:
     col1, col2 = st.columns(2)
 
@@ -414,6 +542,39 @@ if stats:
 
 st.markdown("<br>", unsafe_allow_html=True)
 
+st.markdown('<div class="section-card">', unsafe_allow_html=True)
+st.markdown('<div class="section-title">Revenue over Time</div>', unsafe_allow_html=True)
+
+st.radio("Granularity", ["day", "week", "month"], horizontal=True, label_visibility="collapsed", key="granularity")
+series = data["timeseries"]
+if series and series.get('data'):
+    df_series = pd.DataFrame(series['data'])
+    df_series['date'] = pd.to_datetime(df_series['date'])
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=df_series['date'], y=df_series['nb_achats'], name="Orders",
+        marker_color=COLORS["gray"], yaxis="y2",
+    ))
+    fig.add_trace(go.Scatter(
+        x=df_series['date'], y=df_series['ca'], name="Revenue",
+        mode="lines", line=dict(color=COLORS["khaki_dark"], width=2),
+    ))
+    fig.update_layout(
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        margin=dict(t=20, b=40, l=20, r=20),
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        xaxis=dict(showgrid=False, title=""),
+        yaxis=dict(showgrid=True, gridcolor=COLORS["gray"], title="EUR"),
+        yaxis2=dict(overlaying="y", side="right", showgrid=False, title="Orders"),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"{series['points']} points shown out of {series['source_points']} ({series['downsample']})")
+
+st.markdown('</div>', unsafe_allow_html=True)
+
+st.markdown("<br>", unsafe_allow_html=True)
+
 col1, col2 = st.columns(2)
 
 with col1:
@@ -423,17 +584,16 @@ with col1:
     tab1, tab2 = st.tabs(["Data", "Geography"])
 
     with tab1:
-        clients_data = fetch_clients(limit=50)
-        if clients_data and clients_data.get('data'):
-            df_clients = pd.DataFrame(clients_data['data'])
-            cols_display = ['client_id', 'nom', 'email', 'pays', 'date_inscription']
-            cols_available = [c for c in cols_display if c in df_clients.columns]
-            st.dataframe(
-                df_clients[cols_available],
-                use_container_width=True,
-                height=350,
-                hide_index=True
-            )
+        countries = sorted(row['_id'] for row in (stats or {}).get('by_country', []) if row.get('_id'))
+        col_filter, col_sort, col_size = st.columns(3)
+        with col_filter:
+            st.selectbox("Country", ["All"] + countries, key="clients_pays", on_change=reset_pages, args=("clients",))
+        with col_sort:
+            st.selectbox("Sort", TABLES["clients"]["sorts"], format_func=sort_label, key="clients_sort",
+                         on_change=reset_pages, args=("clients",))
+        with col_size:
+            st.selectbox("Rows", PAGE_SIZES, key="clients_size", on_change=reset_pages, args=("clients",))
+        render_page("clients", data["clients"], ['client_id', 'nom', 'email', 'pays', 'date_inscription'])
 
     with tab2:
         if stats:
@@ -464,33 +624,19 @@ with col2:
     st.markdown('<div class="section-card">', unsafe_allow_html=True)
     st.markdown('<div class="section-title">Orders</div>', unsafe_allow_html=True)
 
-    tab1, tab2 = st.tabs(["Data", "Filter"])
-
-    with tab1:
-        purchases_data = fetch_purchases(limit=50)
-        if purchases_data and purchases_data.get('data'):
-            df_purchases = pd.DataFrame(purchases_data['data'])
-            cols_display = ['achat_id', 'produit', 'montant_total', 'statut', 'date_achat']
-            cols_available = [c for c in cols_display if c in df_purchases.columns]
-            st.dataframe(
-                df_purchases[cols_available],
-                use_container_width=True,
-                height=350,
-                hide_index=True
-            )
-
-    with tab2:
-        selected_status = st.selectbox("Status", ["All", "livré", "en cours", "annulé"], label_visibility="collapsed")
-        status_filter = None if selected_status == "All" else selected_status
-
-        if status_filter:
-            filtered_data = fetch_purchases(limit=50, statut=status_filter)
-            if filtered_data and filtered_data.get('data'):
-                df_filtered = pd.DataFrame(filtered_data['data'])
-                st.caption(f"{len(df_filtered)} orders with status: {status_filter}")
-                cols_display = ['achat_id', 'produit', 'montant_total', 'date_achat']
-                cols_available = [c for c in cols_display if c in df_filtered.columns]
-                st.dataframe(df_filtered[cols_available], use_container_width=True, height=300, hide_index=True)
+    col_filter, col_amount, col_sort, col_size = st.columns(4)
+    with col_filter:
+        st.selectbox("Status", ["All", "livré", "en cours", "annulé"], key="purchases_statut",
+                     on_change=reset_pages, args=("purchases",))
+    with col_amount:
+        st.number_input("Min amount", min_value=0, step=100, key="purchases_min_amount",
+                        on_change=reset_pages, args=("purchases",))
+    with col_sort:
+        st.selectbox("Sort", TABLES["purchases"]["sorts"], format_func=sort_label, key="purchases_sort",
+                     on_change=reset_pages, args=("purchases",))
+    with col_size:
+        st.selectbox("Rows", PAGE_SIZES, key="purchases_size", on_change=reset_pages, args=("purchases",))
+    render_page("purchases", data["purchases"], ['achat_id', 'produit', 'montant_total', 'statut', 'date_achat'])
 
     st.markdown('</div>', unsafe_allow_html=True)
 
@@ -499,7 +645,7 @@ st.markdown("<br>", unsafe_allow_html=True)
 st.markdown('<div class="section-card">', unsafe_allow_html=True)
 st.markdown('<div class="section-title">Sync Performance</div>', unsafe_allow_html=True)
 
-sync_logs = fetch_sync_logs(days=7)
+sync_logs = data["sync_logs"]
 if sync_logs and sync_logs.get('data'):
     df_logs = pd.DataFrame(sync_logs['data'])
 
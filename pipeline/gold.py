@@ -4,21 +4,11 @@ from io import BytesIO
 import sys
 
 sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
 from config import get_minio_client, BUCKET_SILVER, BUCKET_GOLD
+from storage import load_from_minio, remove_stream_parts
 
-
-def load_from_minio(bucket: str, object_name: str) -> pd.DataFrame:
-    client = get_minio_client()
-    parquet_name = object_name.replace(".csv", ".parquet")
-    try:
-        response = client.get_object(bucket, parquet_name)
-        df = pd.read_parquet(BytesIO(response.read()))
-    except Exception:
-        response = client.get_object(bucket, object_name)
-        df = pd.read_csv(BytesIO(response.read()))
-    response.close()
-    response.release_conn()
-    return df
+PARQUET_ROW_GROUP_SIZE = 100_000
 
 
 def save_to_minio(df: pd.DataFrame, object_name: str) -> None:
@@ -27,11 +17,14 @@ def save_to_minio(df: pd.DataFrame, object_name: str) -> None:
     df.to_csv(csv_buffer, index=False)
     csv_buffer.seek(0)
     client.put_object(BUCKET_GOLD, object_name, csv_buffer, length=len(csv_buffer.getvalue()), content_type="text/csv")
+    parquet_buffer = BytesIO()
+    df.to_parquet(parquet_buffer, index=False, row_group_size=PARQUET_ROW_GROUP_SIZE)
+    parquet_buffer.seek(0)
+    client.put_object(BUCKET_GOLD, object_name.replace(".csv", ".parquet"), parquet_buffer, length=len(parquet_buffer.getvalue()))
 
 
-def transform_to_gold():
-    df_clients = load_from_minio(BUCKET_SILVER, "clients_silver.csv")
-    df_achats = load_from_minio(BUCKET_SILVER, "achats_silver.csv")
+def build_dimensions(df_clients: pd.DataFrame, df_achats: pd.DataFrame) -> dict:
+    tables = {}
 
     dim_pays = df_clients[["pays"]].drop_duplicates().reset_index(drop=True)
     dim_pays["pays_id"] = dim_pays.index + 1
@@ -39,19 +32,25 @@ def transform_to_gold():
                "Germany": "Europe", "France": "Europe", "Australia": "Océanie",
                "India": "Asie", "Brazil": "Amérique du Sud", "Japan": "Asie", "China": "Asie"}
     dim_pays["region"] = dim_pays["pays"].map(regions)
-    save_to_minio(dim_pays, "dim_pays.csv")
+    tables["dim_pays"] = dim_pays
 
     dim_produits = df_achats[["produit", "categorie"]].drop_duplicates().reset_index(drop=True)
     dim_produits["produit_id"] = dim_produits.index + 1
-    save_to_minio(dim_produits, "dim_produits.csv")
+    tables["dim_produits"] = dim_produits
 
     dim_clients = df_clients.merge(dim_pays[["pays_id", "pays"]], on="pays", how="left")
-    save_to_minio(dim_clients, "dim_clients.csv")
+    tables["dim_clients"] = dim_clients
 
     fact_achats = df_achats.merge(dim_produits[["produit_id", "produit"]], on="produit", how="left")
     fact_achats = fact_achats.merge(dim_clients[["client_id", "pays_id"]], on="client_id", how="left")
-    save_to_minio(fact_achats, "fact_achats.csv")
+    # Sorted by date so Parquet row group statistics can prune date ranges
+    fact_achats = fact_achats.sort_values("date_achat", kind="stable").reset_index(drop=True)
+    tables["fact_achats"] = fact_achats
+    return tables
 
+
+def build_aggregates(df_clients: pd.DataFrame, df_achats: pd.DataFrame) -> dict:
+    tables = {}
     df_livres = df_achats[df_achats["statut"] == "livré"]
 
     kpi_global = pd.DataFrame([{
@@ -61,51 +60,68 @@ def transform_to_gold():
         "panier_moyen": round(df_livres["montant_total"].mean(), 2),
         "taux_annulation": round(len(df_achats[df_achats["statut"] == "annulé"]) / len(df_achats) * 100, 2)
     }])
-    save_to_minio(kpi_global, "kpi_global.csv")
+    tables["kpi_global"] = kpi_global
 
     df_avec_pays = df_livres.merge(df_clients[["client_id", "pays"]], on="client_id")
     ca_pays = df_avec_pays.groupby("pays").agg(
         ca_total=("montant_total", "sum"), nb_achats=("achat_id", "count")
     ).reset_index().sort_values("ca_total", ascending=False)
     ca_pays["ca_total"] = ca_pays["ca_total"].round(2)
-    save_to_minio(ca_pays, "ca_par_pays.csv")
+    tables["ca_par_pays"] = ca_pays
 
     ca_categorie = df_livres.groupby("categorie").agg(
         ca_total=("montant_total", "sum"), nb_achats=("achat_id", "count")
     ).reset_index().sort_values("ca_total", ascending=False)
     ca_categorie["ca_total"] = ca_categorie["ca_total"].round(2)
-    save_to_minio(ca_categorie, "ca_par_categorie.csv")
+    tables["ca_par_categorie"] = ca_categorie
 
-    df_livres = df_livres.copy()
-    df_livres["date"] = pd.to_datetime(df_livres["date_achat"])
+    # Time series only cover dated achats (silver coerces unparsable dates to null)
+    df_livres = df_livres.assign(date=pd.to_datetime(df_livres["date_achat"]))
+    df_livres = df_livres[df_livres["date"].notna()]
 
     agg_jour = df_livres.groupby(df_livres["date"].dt.date).agg(
         ca=("montant_total", "sum"), nb_achats=("achat_id", "count")
     ).reset_index()
     agg_jour.columns = ["date", "ca", "nb_achats"]
-    save_to_minio(agg_jour, "agg_par_jour.csv")
+    agg_jour["ca"] = agg_jour["ca"].round(2)
+    tables["agg_par_jour"] = agg_jour
 
     df_livres["mois"] = df_livres["date"].dt.to_period("M").astype(str)
     agg_mois = df_livres.groupby("mois").agg(
         ca=("montant_total", "sum"), nb_achats=("achat_id", "count")
     ).reset_index()
+    agg_mois["ca"] = agg_mois["ca"].round(2)
     agg_mois["croissance_pct"] = (agg_mois["ca"].pct_change() * 100).round(2)
-    save_to_minio(agg_mois, "agg_par_mois.csv")
+    tables["agg_par_mois"] = agg_mois
 
-    agg_annee = df_livres.groupby(df_livres["date"].dt.year).agg(
+    agg_annee = df_livres.groupby(df_livres["date"].dt.year.astype(int)).agg(
         ca=("montant_total", "sum"), nb_achats=("achat_id", "count")
     ).reset_index()
     agg_annee.columns = ["annee", "ca", "nb_achats"]
-    save_to_minio(agg_annee, "agg_par_annee.csv")
+    agg_annee["ca"] = agg_annee["ca"].round(2)
+    tables["agg_par_annee"] = agg_annee
 
     dist_statut = df_achats["statut"].value_counts().reset_index()
     dist_statut.columns = ["statut", "count"]
-    save_to_minio(dist_statut, "distribution_statut.csv")
+    tables["distribution_statut"] = dist_statut
 
     dist_paiement = df_achats["mode_paiement"].value_counts().reset_index()
     dist_paiement.columns = ["mode_paiement", "count"]
-    save_to_minio(dist_paiement, "distribution_paiement.csv")
+    tables["distribution_paiement"] = dist_paiement
+
+    return tables
 
+
+def build_gold_tables(df_clients: pd.DataFrame, df_achats: pd.DataFrame) -> dict:
+    return {**build_dimensions(df_clients, df_achats), **build_aggregates(df_clients, df_achats)}
+
+
+def transform_to_gold():
+    df_clients = load_from_minio(BUCKET_SILVER, "clients_silver.parquet", "parquet")
+    df_achats = load_from_minio(BUCKET_SILVER, "achats_silver.parquet", "parquet")
+    for name, df in build_gold_tables(df_clients, df_achats).items():
+        save_to_minio(df, f"{name}.csv")
+    remove_stream_parts(BUCKET_GOLD, "fact_achats.parquet")
     print(f"Gold: {len(list(get_minio_client().list_objects(BUCKET_GOLD)))} fichiers")
 
 
@@ -1,60 +1,436 @@
 import sys
 from pathlib import Path
 import pandas as pd
-from io import BytesIO
+import pyarrow as pa
+import pyarrow.parquet as pq
 import time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
 from config import (
-    get_minio_client, BUCKET_GOLD,
-    get_mongodb_database, get_mongodb_client, create_indexes,
-    COLLECTION_CLIENTS, COLLECTION_ACHATS, COLLECTION_KPI,
-    clear_collection, log_sync
+    BUCKET_GOLD,
+    get_mongodb_database, get_mongodb_client, create_indexes, create_collection_indexes,
+    COLLECTION_CLIENTS, COLLECTION_ACHATS, COLLECTION_KPI, COLLECTION_SYNC_LOG,
+    COLLECTION_CLIENT_SUMMARY, COLLECTION_ACHATS_BUCKETS, COLLECTION_DIM_PRODUITS, COLLECTION_DIM_PAYS,
+    COLLECTION_CLIENT_SEARCH, HASH_FIELD, GOLD_AGGREGATES, INDEXES,
+    MONGODB_BATCH_SIZE, MONGODB_WRITE_WORKERS, MONGODB_SYNC_MODE, MONGODB_KEEP_GENERATIONS,
+    log_sync, is_compact, stored_field, encode_document, decode_stages,
+    compact_document, compact_index_keys, COMPACT_FIELDS, search_keys
 )
+from storage import fetch_object, stream_parts
+from pymongo import InsertOne, UpdateOne, DeleteOne
 
+STAGING_SUFFIX = "__staging"
+GENERATION_SUFFIX = "__gen_"
+MISSING = object()
 
-def load_from_minio(bucket: str, object_name: str) -> pd.DataFrame:
-    client = get_minio_client()
-    parquet_name = object_name.replace(".csv", ".parquet")
+
+def iter_gold(object_name: str, batch_size: int = MONGODB_BATCH_SIZE):
+    """Stream a gold Parquet table as DataFrames of at most ``batch_size`` rows.
+
+    A failed read raises: yielding nothing would look like an empty table and delete every live document.
+    The rows the stream appended since the table was last written (``stream_parts``) follow its own.
+    """
     try:
-        response = client.get_object(bucket, parquet_name)
-        df = pd.read_parquet(BytesIO(response.read()))
-    except Exception:
-        try:
-            response = client.get_object(bucket, object_name)
-            df = pd.read_csv(BytesIO(response.read()))
-        except Exception as e:
-            print(f"✗ Error loading {object_name}: {e}")
-            return pd.DataFrame()
-    finally:
-        if response:
-            response.close()
-            response.release_conn()
-    return df
-
-
-def load_to_mongodb(db, collection_name: str, df: pd.DataFrame) -> dict:
-    if df.empty:
-        print(f"⚠ DataFrame is empty for collection: {collection_name}")
-        return {"status": "skipped", "row_count": 0, "duration_seconds": 0}
-    
+        paths = [fetch_object(BUCKET_GOLD, name)
+                 for name in [object_name] + [obj.object_name for obj in stream_parts(BUCKET_GOLD, object_name)]]
+    except Exception as e:
+        print(f"✗ Error loading {object_name}: {e}")
+        raise
+    for path in paths:
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield _bson_frame(pa.Table.from_batches([batch]))
+
+
+def iter_frame(df: pd.DataFrame, batch_size: int = MONGODB_BATCH_SIZE):
+    """Split an in-memory gold table into DataFrames shaped like the ones ``iter_gold`` yields."""
+    for batch in pa.Table.from_pandas(df, preserve_index=False).to_batches(max_chunksize=batch_size):
+        yield _bson_frame(pa.Table.from_batches([batch]))
+
+
+def _bson_frame(table: pa.Table) -> pd.DataFrame:
+    # BSON has no date-only type: keep dates as YYYY-MM-DD strings like date_achat
+    for i, field in enumerate(table.schema):
+        if pa.types.is_date(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.string()))
+    return table.to_pandas()
+
+
+def row_hashes(df: pd.DataFrame) -> pd.Series:
+    return pd.util.hash_pandas_object(df, index=False).map("{:016x}".format)
+
+
+def load_to_mongodb(db, collection_name: str, batches, key: str, delete_missing: bool = True,
+                    extra_columns: dict | None = None, workers: int = MONGODB_WRITE_WORKERS,
+                    target: str | None = None, track: tuple[str, set] | None = None) -> dict:
+    """Upsert only new or changed rows, matched on ``key`` and compared by row hash.
+
+    ``batches`` is an iterable of DataFrames; each one is turned into a single
+    unordered ``bulk_write`` run on a thread pool, with at most ``2 * workers``
+    batches in flight so memory stays bounded. ``target`` writes to another
+    physical collection (e.g. a staging one) while logging under ``collection_name``.
+    ``track=(field, values)`` adds to ``values`` the old and new ``field`` of every
+    inserted, updated or deleted row (e.g. the clients whose views must be rebuilt).
+    With ``delete_missing=False`` (stream appends) the cost follows the batches, not the collection.
+    """
     start_time = time.time()
-    deleted_count = clear_collection(db, collection_name)
-    records = df.to_dict(orient='records')
+    collection = db[target or collection_name]
+    compact = is_compact(collection_name)
+    stored_key = stored_field(collection_name, key)
+    stored_track = stored_field(collection_name, track[0]) if track else None
 
-    if records:
-        result = db[collection_name].insert_many(records)
-        duration = time.time() - start_time
-        log_entry = log_sync(db, collection_name, "success", len(result.inserted_ids), duration)
-        
-        print(f"✓ {collection_name}: {len(result.inserted_ids)} documents loaded in {duration:.2f}s")
+    def track_stored(keys):
+        if track and keys:
+            track[1].update(doc.get(stored_track) for doc in
+                            collection.find({stored_key: {"$in": keys}}, {stored_track: 1, "_id": 0}))
+    def read_hashes(query):
+        return {doc.get(stored_key): doc.get(HASH_FIELD)
+                for doc in collection.find(query, {stored_key: 1, HASH_FIELD: 1, "_id": 0})}
+    # Deletes need every live key; otherwise only the keys of each batch are looked up
+    existing = read_hashes({}) if delete_missing else {}
+
+    rows = 0
+    counts = {"inserted": 0, "updated": 0, "deleted": 0, "skipped": 0}
+    pending = set()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for df in batches:
+            if extra_columns:
+                df = df.assign(**extra_columns)
+            hashes = row_hashes(df)
+            # Hashes differ per schema so switching schema rewrites every document
+            df = df.assign(**{HASH_FIELD: "c" + hashes if compact else hashes})
+            rows += len(df)
+
+            operations = []
+            updated = []
+            records = [encode_document(collection_name, record) for record in df.to_dict(orient='records')]
+            if not delete_missing:
+                existing = read_hashes({stored_key: {"$in": [record[stored_key] for record in records]}})
+            for record in records:
+                current_hash = existing.pop(record[stored_key], MISSING)
+                if current_hash == record[HASH_FIELD]:
+                    counts["skipped"] += 1
+                    continue
+                if current_hash is MISSING:
+                    counts["inserted"] += 1
+                    operations.append(InsertOne(record))
+                else:
+                    counts["updated"] += 1
+                    updated.append(record[stored_key])
+                    operations.append(UpdateOne({stored_key: record[stored_key]}, {"$set": record}, upsert=True))
+                if track:
+                    track[1].add(record[stored_track])
+
+            if operations:
+                # Values before the update (a purchase moved to another client changes both)
+                track_stored(updated)
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                pending.add(executor.submit(collection.bulk_write, operations, ordered=False))
+
+        # An empty read is never trusted as "everything was deleted"
+        if delete_missing and existing and rows:
+            counts["deleted"] = len(existing)
+            track_stored(list(existing))
+            deletes = [DeleteOne({stored_key: missing_key}) for missing_key in existing]
+            for i in range(0, len(deletes), MONGODB_BATCH_SIZE):
+                pending.add(executor.submit(collection.bulk_write, deletes[i:i + MONGODB_BATCH_SIZE], ordered=False))
+
+        for future in pending:
+            future.result()
+
+    if rows == 0:
+        print(f"⚠ No rows for collection: {collection_name}"
+              + (f" ({len(existing)} existing documents kept)" if existing else ""))
+        return {"status": "skipped", "row_count": 0, "duration_seconds": 0}
+
+    duration = time.time() - start_time
+    touched = counts["inserted"] + counts["updated"] + counts["deleted"]
+    log_entry = log_sync(db, collection_name, "success", touched, duration, touched=touched,
+                         target=collection.name, **counts)
+
+    print(f"✓ {collection_name}: {touched} documents touched ({counts['inserted']} inserted, "
+          f"{counts['updated']} updated, {counts['deleted']} deleted), {counts['skipped']} unchanged in {duration:.2f}s "
+          f"({rows / duration:.0f} rows/s)")
+    return log_entry
+
+
+def list_generations(db, collection_name: str) -> list[str]:
+    prefix = f"{collection_name}{GENERATION_SUFFIX}"
+    return sorted(name for name in db.list_collection_names() if name.startswith(prefix))
+
+
+def swap_to_mongodb(db, collection_name: str, batches, key: str, extra_columns: dict | None = None,
+                    keep_generations: int = MONGODB_KEEP_GENERATIONS) -> dict:
+    """Blue/green load: bulk load an index-free staging collection, index it, then swap it in.
+
+    The live collection is replaced by an atomic ``renameCollection`` with
+    ``dropTarget``, so readers never see a partially loaded collection. The
+    previous live data is first copied server-side into a ``__gen_<timestamp>``
+    collection, keeping the last ``keep_generations`` for ``rollback_collection``.
+    """
+    staging = f"{collection_name}{STAGING_SUFFIX}"
+    db.drop_collection(staging)
+
+    log_entry = load_to_mongodb(db, collection_name, batches, key, extra_columns=extra_columns, target=staging)
+    if log_entry["status"] != "success":
+        db.drop_collection(staging)
         return log_entry
+
+    start_time = time.time()
+    create_collection_indexes(db, collection_name, target=staging)
+    index_duration = time.time() - start_time
+
+    if keep_generations > 0 and collection_name in db.list_collection_names():
+        archive = f"{collection_name}{GENERATION_SUFFIX}{datetime.utcnow():%Y%m%dT%H%M%S}"
+        db[collection_name].aggregate([{"$match": {}}, {"$out": archive}])
+
+    db[staging].rename(collection_name, dropTarget=True)
+
+    for old in list_generations(db, collection_name)[:-keep_generations or None]:
+        db.drop_collection(old)
+
+    print(f"✓ {collection_name}: staging swapped in (indexes built in {index_duration:.2f}s)")
+    return log_entry
+
+
+def rollback_collection(db, collection_name: str) -> str | None:
+    """Swap the most recent kept generation back in as the live collection."""
+    generations = list_generations(db, collection_name)
+    if not generations:
+        print(f"✗ {collection_name}: no generation to roll back to")
+        return None
+    previous = generations[-1]
+    create_collection_indexes(db, collection_name, target=previous)
+    db[previous].rename(collection_name, dropTarget=True)
+    log_sync(db, collection_name, "rollback", db[collection_name].estimated_document_count(), 0, target=previous)
+    print(f"✓ {collection_name}: rolled back to {previous}")
+    return previous
+
+
+BUCKET_PURCHASE_FIELDS = [
+    "achat_id", "produit_id", "produit", "categorie", "quantite",
+    "prix_unitaire", "montant_total", "date_achat", "statut", "mode_paiement",
+]
+
+SUMMARY_CLIENT_FIELDS = ["nom", "email", "pays", "pays_id", "date_inscription"]
+
+
+def bucket_pipeline() -> list[dict]:
+    """Month buckets of purchases per client, from achats."""
+    return [
+        {"$sort": {stored_field(COLLECTION_ACHATS, "client_id"): 1, stored_field(COLLECTION_ACHATS, "date_achat"): 1}},
+        *decode_stages(COLLECTION_ACHATS),
+        {"$group": {
+            "_id": {"client_id": "$client_id", "mois": {"$substrBytes": ["$date_achat", 0, 7]}},
+            "nb_achats": {"$sum": 1},
+            "montant_total": {"$sum": "$montant_total"},
+            "purchases": {"$push": {field: f"${field}" for field in BUCKET_PURCHASE_FIELDS}},
+        }},
+        {"$project": {
+            "_id": 0, "client_id": "$_id.client_id", "mois": "$_id.mois",
+            "nb_achats": 1, "montant_total": {"$round": ["$montant_total", 2]}, "purchases": 1,
+        }},
+    ]
+
+
+def summary_pipeline() -> list[dict]:
+    """One summary per client with purchases, from achats and clients."""
+    client_stages = decode_stages(COLLECTION_CLIENTS, SUMMARY_CLIENT_FIELDS)
+    return [
+        *decode_stages(COLLECTION_ACHATS, ["client_id", "categorie", "montant_total", "statut", "date_achat"]),
+        {"$group": {
+            "_id": {"client_id": "$client_id", "categorie": "$categorie"},
+            "nb_achats": {"$sum": 1},
+            "montant_total": {"$sum": "$montant_total"},
+            "ca_total": {"$sum": {"$cond": [{"$eq": ["$statut", "livré"]}, "$montant_total", 0]}},
+            "premier_achat": {"$min": "$date_achat"},
+            "dernier_achat": {"$max": "$date_achat"},
+        }},
+        {"$sort": {"_id.client_id": 1, "nb_achats": -1, "montant_total": -1, "_id.categorie": 1}},
+        {"$group": {
+            "_id": "$_id.client_id",
+            "categorie_favorite": {"$first": "$_id.categorie"},
+            "nb_achats": {"$sum": "$nb_achats"},
+            "montant_total": {"$sum": "$montant_total"},
+            "ca_total": {"$sum": "$ca_total"},
+            "premier_achat": {"$min": "$premier_achat"},
+            "dernier_achat": {"$max": "$dernier_achat"},
+        }},
+        {"$lookup": {
+            "from": COLLECTION_CLIENTS, "localField": "_id", "foreignField": stored_field(COLLECTION_CLIENTS, "client_id"),
+            **({"pipeline": client_stages} if client_stages else {}), "as": "client",
+        }},
+        {"$project": {
+            "_id": 0,
+            "client_id": "$_id",
+            **{field: {"$arrayElemAt": [f"$client.{field}", 0]} for field in SUMMARY_CLIENT_FIELDS},
+            "nb_achats": 1,
+            "montant_total": {"$round": ["$montant_total", 2]},
+            "ca_total": {"$round": ["$ca_total", 2]},
+            "premier_achat": 1,
+            "dernier_achat": 1,
+            "categorie_favorite": 1,
+        }},
+    ]
+
+
+def build_client_views(db, client_ids=None) -> dict:
+    """Rebuild per-client summaries and month buckets of purchases server-side.
+
+    Without ``client_ids`` both collections are written with ``$out``, which replaces
+    them atomically. With ``client_ids`` (the clients touched by a diff sync or a
+    micro-batch) only their documents are recomputed and replaced, in batches.
+    """
+    start_time = time.time()
+    views = ((COLLECTION_ACHATS_BUCKETS, bucket_pipeline()), (COLLECTION_CLIENT_SUMMARY, summary_pipeline()))
+
+    if client_ids is None:
+        for name, pipeline in views:
+            db[COLLECTION_ACHATS].aggregate([*pipeline, {"$out": name}], allowDiskUse=True)
+        for name, _ in views:
+            create_collection_indexes(db, name)
+        summaries = db[COLLECTION_CLIENT_SUMMARY].estimated_document_count()
+        buckets = db[COLLECTION_ACHATS_BUCKETS].estimated_document_count()
     else:
-        return {"status": "empty", "row_count": 0, "duration_seconds": 0}
+        client_ids = sorted(client_ids)
+        summaries = buckets = 0
+        for i in range(0, len(client_ids), MONGODB_BATCH_SIZE):
+            batch = client_ids[i:i + MONGODB_BATCH_SIZE]
+            match = {"$match": {stored_field(COLLECTION_ACHATS, "client_id"): {"$in": batch}}}
+            for name, pipeline in views:
+                docs = list(db[COLLECTION_ACHATS].aggregate([match, *pipeline], allowDiskUse=True))
+                # Replaced rather than merged: a client whose last purchase is gone loses its documents
+                db[name].delete_many({"client_id": {"$in": batch}})
+                if docs:
+                    db[name].insert_many(docs, ordered=False)
+                if name == COLLECTION_CLIENT_SUMMARY:
+                    summaries += len(docs)
+                else:
+                    buckets += len(docs)
+
+    duration = time.time() - start_time
+    scope = "all clients" if client_ids is None else f"{len(client_ids)} changed clients"
+    log_entry = log_sync(db, COLLECTION_CLIENT_SUMMARY, "success", summaries, duration, buckets=buckets,
+                         incremental=client_ids is not None)
+    print(f"✓ {COLLECTION_CLIENT_SUMMARY}: {summaries} summaries, {buckets} monthly buckets ({scope}) in {duration:.2f}s")
+    return log_entry
+
+
+def _collection_stats(db, name: str) -> dict | None:
+    try:
+        stats = db.command("collStats", name)
+    except Exception:
+        return None
+    return {
+        "size": stats.get("size", 0),
+        "storage": stats.get("storageSize", 0),
+        "indexes": stats.get("totalIndexSize", 0),
+        # Uncompressed documents plus indexes, what the cache must hold for a full scan
+        "working_set": stats.get("size", 0) + stats.get("totalIndexSize", 0),
+    }
+
+
+def measure_schema(db, sample_rows: int | None = None) -> dict:
+    """Load clients and achats in both document schemas side by side and compare their sizes."""
+    import bson
+
+    results = {}
+    for collection_name, object_name in ((COLLECTION_CLIENTS, "dim_clients.parquet"),
+                                         (COLLECTION_ACHATS, "fact_achats.parquet")):
+        docs = {"standard": [], "compact": []}
+        for df in iter_gold(object_name):
+            df = df.assign(**{HASH_FIELD: row_hashes(df)})
+            for record in df.to_dict(orient="records"):
+                docs["standard"].append(record)
+                docs["compact"].append(compact_document(collection_name, record))
+            if sample_rows and len(docs["standard"]) >= sample_rows:
+                break
+
+        for schema, schema_docs in docs.items():
+            schema_docs = schema_docs[:sample_rows]
+            name = f"{collection_name}__schema_{schema}"
+            db.drop_collection(name)
+            db[name].insert_many([dict(doc) for doc in schema_docs])
+            for keys, options in INDEXES[collection_name]:
+                db[name].create_index(compact_index_keys(collection_name, keys) if schema == "compact" else keys,
+                                      **options)
+            results[(collection_name, schema)] = {
+                "documents": len(schema_docs),
+                "bson": sum(len(bson.encode(doc)) for doc in schema_docs),
+                "stats": _collection_stats(db, name),
+            }
+            db.drop_collection(name)
+
+    print(f"{'collection':<10} {'schéma':<9} {'docs':>8} {'BSON/doc':>9} {'data':>11} {'stockage':>11} "
+          f"{'index':>11} {'working set':>12}")
+    for (collection_name, schema), result in results.items():
+        stats = result["stats"] or {}
+        columns = [stats.get(k) for k in ("size", "storage", "indexes", "working_set")]
+        print(f"{collection_name:<10} {schema:<9} {result['documents']:>8} "
+              f"{result['bson'] / max(result['documents'], 1):>9.1f} "
+              + " ".join(f"{c:>11}" if c is not None else f"{'-':>11}" for c in columns))
+    for collection_name in COMPACT_FIELDS:
+        standard, compact = results[(collection_name, "standard")], results[(collection_name, "compact")]
+        reductions = {"BSON": (standard["bson"], compact["bson"])}
+        if standard["stats"] and compact["stats"]:
+            for label, key in (("index", "indexes"), ("working set", "working_set")):
+                reductions[label] = (standard["stats"][key], compact["stats"][key])
+        print(f"📉 {collection_name}: " + ", ".join(
+            f"{label} -{(1 - after / before) * 100:.0f}%" for label, (before, after) in reductions.items() if before
+        ))
+    return results
+
 
+def client_search_batches(batches):
+    """Search documents of the clients: display fields plus the prefix keys of name and email."""
+    for df in batches:
+        df = df[["client_id", "nom", "email", "pays"]]
+        yield df.assign(keys=[search_keys(nom, email) for nom, email in zip(df["nom"], df["email"])])
 
-def transform_gold_to_mongodb():
+
+def gold_loads(read) -> list[tuple]:
+    """(collection, batches, key, extra columns) of every collection loaded from gold.
+
+    ``read(table)`` returns the batches of a gold table (``dim_clients``...).
+    """
+    return [
+        (COLLECTION_DIM_PRODUITS, read("dim_produits"), "produit_id", None),
+        (COLLECTION_DIM_PAYS, read("dim_pays"), "pays_id", None),
+        (COLLECTION_CLIENTS, read("dim_clients"), "client_id", None),
+        (COLLECTION_CLIENT_SEARCH, client_search_batches(read("dim_clients")), "client_id", None),
+        (COLLECTION_ACHATS, read("fact_achats"), "achat_id", None),
+        (COLLECTION_KPI, read("kpi_global"), "scope", {"scope": "global"}),
+    ] + [
+        (name, read(name), spec["key"], None) for name, spec in GOLD_AGGREGATES.items()
+    ]
+
+
+# Collections the client views are computed from
+VIEW_SOURCES = (COLLECTION_ACHATS, COLLECTION_CLIENTS)
+
+
+def full_views_rebuild(db, changed_clients: set) -> bool:
+    """Rebuild the client views from scratch when missing, or when most clients changed ($out is then cheaper)."""
+    if COLLECTION_CLIENT_SUMMARY not in db.list_collection_names():
+        return True
+    return len(changed_clients) * 2 > db[COLLECTION_CLIENTS].estimated_document_count()
+
+
+def stamp_kpi(db, log_entry: dict) -> None:
+    """Set ``date_update`` on the KPI row when it was (re)written, and always after a swap.
+
+    Kept out of the loaded columns so it does not change the row hash and force a rewrite on every sync.
+    """
+    if log_entry.get("status") == "success" and (log_entry.get("touched") or log_entry.get("target") != COLLECTION_KPI):
+        db[COLLECTION_KPI].update_one({"scope": "global"}, {"$set": {"date_update": datetime.utcnow()}})
+
+
+def transform_gold_to_mongodb(mode: str = MONGODB_SYNC_MODE):
     print("\n" + "="*60)
     print("🔄 Starting Gold → MongoDB Pipeline")
     print("="*60)
@@ -62,22 +438,38 @@ def transform_gold_to_mongodb():
     try:
         mdb_client = get_mongodb_client()
         db = get_mongodb_database(mdb_client)
-        create_indexes(db)
+        if mode == "diff":
+            create_indexes(db)
+        elif mode == "swap":
+            create_collection_indexes(db, COLLECTION_SYNC_LOG)
+        else:
+            raise ValueError(f"Unknown sync mode: {mode} (expected: diff, swap)")
 
-        print("\n📥 Loading Clients dimension...")
-        df_clients = load_from_minio(BUCKET_GOLD, "dim_clients.csv")
-        log_clients = load_to_mongodb(db, COLLECTION_CLIENTS, df_clients)
+        print(f"\n📥 Loading Clients, Purchases, KPI and gold aggregates concurrently ({mode} mode)...")
+        loads = gold_loads(lambda table: iter_gold(f"{table}.parquet"))
+        # Clients whose summary or buckets are affected by this diff sync
+        changed_clients = set()
+        with ThreadPoolExecutor(max_workers=len(loads)) as executor:
+            futures = {}
+            for collection_name, batches, key, extra_columns in loads:
+                if mode == "swap":
+                    futures[collection_name] = executor.submit(swap_to_mongodb, db, collection_name, batches, key,
+                                                               extra_columns=extra_columns)
+                else:
+                    track = ("client_id", changed_clients) if collection_name in VIEW_SOURCES else None
+                    futures[collection_name] = executor.submit(load_to_mongodb, db, collection_name, batches, key,
+                                                               extra_columns=extra_columns, track=track)
+            results = {collection_name: future.result() for collection_name, future in futures.items()}
+        stamp_kpi(db, results[COLLECTION_KPI])
 
-        print("\n📥 Loading Purchases fact table...")
-        df_achats = load_from_minio(BUCKET_GOLD, "fact_achats.csv")
-        log_achats = load_to_mongodb(db, COLLECTION_ACHATS, df_achats)
+        print("\n📥 Building client summaries and purchase buckets...")
+        if mode == "swap" or full_views_rebuild(db, changed_clients):
+            build_client_views(db)
+        elif changed_clients:
+            build_client_views(db, changed_clients)
+        else:
+            print(f"✓ {COLLECTION_CLIENT_SUMMARY}: no client changed")
 
-        print("\n📥 Loading KPI...")
-        df_kpi = load_from_minio(BUCKET_GOLD, "kpi_global.csv")
-        if not df_kpi.empty:
-            df_kpi['date_update'] = datetime.utcnow()
-            log_kpi = load_to_mongodb(db, COLLECTION_KPI, df_kpi)
-        
         print("\n" + "="*60)
         print("✅ Gold → MongoDB Pipeline Completed Successfully")
         print("="*60)
@@ -101,5 +493,25 @@ def transform_gold_to_mongodb():
 
 
 if __name__ == "__main__":
-    success = transform_gold_to_mongodb()
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["diff", "swap"], default=MONGODB_SYNC_MODE)
+    parser.add_argument("--rollback", metavar="COLLECTION", help="restaure la génération précédente d'une collection")
+    parser.add_argument("--measure-schema", action="store_true",
+                        help="compare la taille des documents, index et working set en schéma standard et compact")
+    parser.add_argument("--sample", type=int, help="nombre de lignes pour --measure-schema (défaut: tout)")
+    args = parser.parse_args()
+
+    if args.measure_schema:
+        mdb_client = get_mongodb_client()
+        measure_schema(get_mongodb_database(mdb_client), args.sample)
+        mdb_client.close()
+        success = True
+    elif args.rollback:
+        mdb_client = get_mongodb_client()
+        success = rollback_collection(get_mongodb_database(mdb_client), args.rollback) is not None
+        mdb_client.close()
+    else:
+        success = transform_gold_to_mongodb(args.mode)
     sys.exit(0 if success else 1)
@@ -0,0 +1,226 @@
+import os
+import sys
+import time
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+from config import BUCKET_BRONZE, BUCKET_SILVER, BUCKET_GOLD
+from storage import load_from_minio, remove_stream_parts
+from silver import clean_clients, clean_achats, load_raw_achats, save_to_minio as save_silver_to_minio
+from gold import build_dimensions, build_gold_tables, save_to_minio as save_gold_to_minio
+
+PARTITIONS_PER_WORKER = 4
+
+_client_pays = None
+
+
+def _to_ipc(df: pd.DataFrame) -> bytes:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _from_ipc(data: bytes) -> pd.DataFrame:
+    return pa.ipc.open_stream(data).read_all().to_pandas()
+
+
+def _init_worker(client_pays: bytes) -> None:
+    global _client_pays
+    _client_pays = _from_ipc(client_pays)
+
+
+def partition_achats(df_raw: pd.DataFrame, partition_by: str, n_partitions: int) -> list[pd.DataFrame]:
+    df_raw = df_raw.assign(_row=range(len(df_raw)))
+    if partition_by == "month":
+        keys = df_raw["date_achat"].astype(str).str[:7]
+    elif partition_by == "client":
+        keys = pd.util.hash_array(df_raw["client_id"].to_numpy()) % n_partitions
+    else:
+        raise ValueError(f"Partitionnement inconnu: {partition_by} (attendu: month, client)")
+    return [part for _, part in df_raw.groupby(keys, sort=True, dropna=False)]
+
+
+def partial_aggregates(df: pd.DataFrame, client_pays: pd.DataFrame) -> dict:
+    df_livres = df[df["statut"] == "livré"]
+    sums = {"ca": ("montant_total", "sum"), "nb_achats": ("achat_id", "count")}
+
+    jours = pd.to_datetime(df_livres["date_achat"]).dt.date
+    return {
+        "kpi": pd.DataFrame([{
+            "total_achats": len(df),
+            "ca_livres": df_livres["montant_total"].sum(),
+            "nb_livres": len(df_livres),
+            "nb_annules": int((df["statut"] == "annulé").sum()),
+        }]),
+        "pays": df_livres.merge(client_pays, on="client_id").groupby("pays").agg(**sums).reset_index(),
+        "categorie": df_livres.groupby("categorie").agg(**sums).reset_index(),
+        "jour": df_livres.groupby(jours.rename("date")).agg(**sums).reset_index(),
+        "statut": df.groupby("statut").agg(count=("_row", "size"), first_row=("_row", "min")).reset_index(),
+        "mode_paiement": df.groupby("mode_paiement").agg(count=("_row", "size"), first_row=("_row", "min")).reset_index(),
+    }
+
+
+def _process_partition(data: bytes) -> tuple[bytes, dict]:
+    df = clean_achats(_from_ipc(data))
+    partials = partial_aggregates(df, _client_pays)
+    return _to_ipc(df), {name: _to_ipc(partial) for name, partial in partials.items()}
+
+
+def _merge_sums(parts: list[pd.DataFrame], key: str) -> pd.DataFrame:
+    return pd.concat(parts).groupby(key)[["ca", "nb_achats"]].sum().reset_index()
+
+
+def _merge_counts(parts: list[pd.DataFrame], key: str) -> pd.DataFrame:
+    merged = pd.concat(parts).groupby(key).agg(count=("count", "sum"), first_row=("first_row", "min"))
+    counts = merged.sort_values("first_row")["count"]
+    counts = counts.sort_values(ascending=False).reset_index()
+    counts.columns = [key, "count"]
+    return counts
+
+
+def collapse_partials(partials: dict) -> dict:
+    """Merge a list of partial aggregates per name into a single partial of the same shape.
+
+    Lets the stream fold each micro-batch into a running state that stays as small as the aggregates.
+    """
+    collapsed = {"kpi": pd.concat(partials["kpi"]).sum().to_frame().T}
+    for name in ("pays", "categorie"):
+        collapsed[name] = _merge_sums(partials[name], name)
+    collapsed["jour"] = _merge_sums(partials["jour"], "date")
+    for name in ("statut", "mode_paiement"):
+        collapsed[name] = pd.concat(partials[name]).groupby(name).agg(
+            count=("count", "sum"), first_row=("first_row", "min")).reset_index()
+    return collapsed
+
+
+def merge_aggregates(df_clients: pd.DataFrame, partials: dict) -> dict:
+    tables = {}
+
+    kpi = pd.concat(partials["kpi"]).sum()
+    tables["kpi_global"] = pd.DataFrame([{
+        "total_clients": len(df_clients),
+        "total_achats": int(kpi["total_achats"]),
+        "ca_total": round(kpi["ca_livres"], 2),
+        "panier_moyen": round(kpi["ca_livres"] / kpi["nb_livres"], 2) if kpi["nb_livres"] else float("nan"),
+        "taux_annulation": round(kpi["nb_annules"] / kpi["total_achats"] * 100, 2)
+    }])
+
+    for name, key in (("ca_par_pays", "pays"), ("ca_par_categorie", "categorie")):
+        ca = _merge_sums(partials[key], key).rename(columns={"ca": "ca_total"})
+        ca = ca.sort_values("ca_total", ascending=False)
+        ca["ca_total"] = ca["ca_total"].round(2)
+        tables[name] = ca
+
+    jours = _merge_sums(partials["jour"], "date")
+    dates = pd.to_datetime(jours["date"])
+
+    agg_jour = jours.copy()
+    agg_jour["ca"] = agg_jour["ca"].round(2)
+    tables["agg_par_jour"] = agg_jour
+
+    agg_mois = jours.groupby(dates.dt.to_period("M").astype(str).rename("mois"))[["ca", "nb_achats"]].sum().reset_index()
+    agg_mois["ca"] = agg_mois["ca"].round(2)
+    agg_mois["croissance_pct"] = (agg_mois["ca"].pct_change() * 100).round(2)
+    tables["agg_par_mois"] = agg_mois
+
+    agg_annee = jours.groupby(dates.dt.year.astype(int).rename("annee"))[["ca", "nb_achats"]].sum().reset_index()
+    agg_annee["ca"] = agg_annee["ca"].round(2)
+    tables["agg_par_annee"] = agg_annee
+
+    tables["distribution_statut"] = _merge_counts(partials["statut"], "statut")
+    tables["distribution_paiement"] = _merge_counts(partials["mode_paiement"], "mode_paiement")
+    return tables
+
+
+def process_parallel(df_clients: pd.DataFrame, df_raw: pd.DataFrame, workers: int,
+                     partition_by: str = "month") -> tuple[pd.DataFrame, dict]:
+    """Clean and aggregate raw achats on a process pool.
+
+    Returns the silver achats and the gold tables, identical to
+    ``clean_achats`` followed by ``build_gold_tables``.
+    """
+    partitions = partition_achats(df_raw, partition_by, workers * PARTITIONS_PER_WORKER)
+    client_pays = _to_ipc(df_clients[["client_id", "pays"]])
+
+    cleaned, partials = [], {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(client_pays,)) as executor:
+        for rows, partial in executor.map(_process_partition, [_to_ipc(part) for part in partitions]):
+            cleaned.append(_from_ipc(rows))
+            for name, data in partial.items():
+                partials.setdefault(name, []).append(_from_ipc(data))
+
+    df_achats = pd.concat(cleaned).sort_values("_row")
+    deduplicated = df_achats.drop_duplicates(subset=["achat_id"], keep="first")
+    df_achats = deduplicated.drop(columns="_row").reset_index(drop=True)
+
+    if len(deduplicated) != sum(len(part) for part in cleaned):
+        # An achat_id appears in several partitions: partial aggregates would count it twice
+        print("⚠ achat_id dupliqués entre partitions, agrégation Gold sur un seul processus")
+        return df_achats, build_gold_tables(df_clients, df_achats)
+
+    return df_achats, {**build_dimensions(df_clients, df_achats), **merge_aggregates(df_clients, partials)}
+
+
+def transform_parallel(workers: int = os.cpu_count(), partition_by: str = "month") -> None:
+    start_time = time.time()
+    df_clients = clean_clients(load_from_minio(BUCKET_BRONZE, "clients.csv", "csv"))
+    save_silver_to_minio(df_clients, BUCKET_SILVER, "clients_silver.csv")
+    print(f"Silver clients: {len(df_clients)}")
+
+    df_raw = load_raw_achats()
+    df_achats, tables = process_parallel(df_clients, df_raw, workers, partition_by)
+    save_silver_to_minio(df_achats, BUCKET_SILVER, "achats_silver.csv")
+    remove_stream_parts(BUCKET_SILVER, "achats_silver.parquet")
+    print(f"Silver achats: {len(df_achats)}")
+
+    for name, df in tables.items():
+        save_gold_to_minio(df, f"{name}.csv")
+    remove_stream_parts(BUCKET_GOLD, "fact_achats.parquet")
+    print(f"Gold: {len(tables)} tables ({workers} workers, partition par {partition_by}) "
+          f"en {time.time() - start_time:.2f}s")
+
+
+def benchmark(clients_path: str, achats_path: str, max_workers: int, partition_by: str) -> None:
+    df_clients = clean_clients(pd.read_csv(clients_path))
+    df_raw = pd.read_csv(achats_path)
+
+    start_time = time.time()
+    reference_achats = clean_achats(df_raw.copy())
+    reference = build_gold_tables(df_clients, reference_achats)
+    baseline = time.time() - start_time
+    print(f"{len(df_raw)} achats bruts, partition par {partition_by}")
+    print(f"{'workers':>8} {'durée (s)':>10} {'speedup':>8} {'identique':>10}")
+    print(f"{'1 proc':>8} {baseline:>10.2f} {1.0:>8.2f} {'-':>10}")
+
+    steps = sorted({2 ** i for i in range(max_workers.bit_length()) if 2 ** i <= max_workers} | {max_workers})
+    for workers in steps:
+        start_time = time.time()
+        df_achats, tables = process_parallel(df_clients, df_raw, workers, partition_by)
+        duration = time.time() - start_time
+        identical = df_achats.equals(reference_achats.reset_index(drop=True)) and all(
+            tables[name].reset_index(drop=True).equals(reference[name].reset_index(drop=True)) for name in reference
+        )
+        print(f"{workers:>8} {duration:>10.2f} {baseline / duration:>8.2f} {str(identical):>10}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    data_dir = Path(__file__).parent.parent / "data"
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--partition-by", choices=["month", "client"], default="month")
+    parser.add_argument("--bench", action="store_true", help="courbe de scaling de 1 à --workers sur data/*.csv")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(str(data_dir / "clients.csv"), str(data_dir / "achats.csv"), args.workers, args.partition_by)
+    else:
+        transform_parallel(args.workers, args.partition_by)
@@ -0,0 +1,257 @@
+import io
+import sys
+import operator
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config import get_minio_client
+
+FOOTER_PREFETCH_BYTES = 64 * 1024
+COALESCE_GAP_BYTES = 8 * 1024
+
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+class RangeFile(io.RawIOBase):
+    """Seekable file over an object whose bytes are fetched by range on demand.
+
+    Ranges fetched ahead of time with ``prefetch`` are kept in memory and
+    served without further requests.
+    """
+
+    def __init__(self, size: int, fetch_range, max_workers: int = 8):
+        self.size = size
+        self.fetch_range = fetch_range
+        self.max_workers = max_workers
+        self.position = 0
+        self.buffers = []
+        self.bytes_fetched = 0
+        self.requests = 0
+
+    def _fetch(self, start: int, length: int) -> bytes:
+        data = self.fetch_range(start, length)
+        self.bytes_fetched += len(data)
+        self.requests += 1
+        return data
+
+    def prefetch(self, ranges: list[tuple[int, int]]) -> None:
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start - merged[-1][1] <= COALESCE_GAP_BYTES:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        missing = [hole for start, end in merged for hole in self._holes(start, end)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            chunks = executor.map(lambda r: self._fetch(r[0], r[1] - r[0]), missing)
+            for (start, _), data in zip(missing, chunks):
+                self.buffers.append((start, data))
+        self.buffers.sort(key=lambda buffer: buffer[0])
+
+    def _holes(self, start: int, end: int) -> list[tuple[int, int]]:
+        holes = []
+        for buffer_start, data in self.buffers:
+            buffer_end = buffer_start + len(data)
+            if buffer_end <= start or buffer_start >= end:
+                continue
+            if buffer_start > start:
+                holes.append((start, buffer_start))
+            start = max(start, buffer_end)
+        if start < end:
+            holes.append((start, end))
+        return holes
+
+    def _read(self, start: int, length: int) -> bytes:
+        end = start + length
+        if self._holes(start, end):
+            for hole_start, hole_end in self._holes(start, end):
+                self.buffers.append((hole_start, self._fetch(hole_start, hole_end - hole_start)))
+            self.buffers.sort(key=lambda buffer: buffer[0])
+        out = bytearray()
+        for buffer_start, data in self.buffers:
+            buffer_end = buffer_start + len(data)
+            position = start + len(out)
+            if buffer_end <= position or buffer_start > position:
+                continue
+            out += data[position - buffer_start:min(len(data), end - buffer_start)]
+            if len(out) == length:
+                break
+        return bytes(out)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        else:
+            self.position = self.size + offset
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        length = min(len(buffer), self.size - self.position)
+        if length <= 0:
+            return 0
+        data = self._read(self.position, length)
+        buffer[:length] = data
+        self.position += length
+        return length
+
+
+def open_minio_range_file(bucket: str, object_name: str, client=None, max_workers: int = 8) -> RangeFile:
+    client = client or get_minio_client()
+    size = client.stat_object(bucket, object_name).size
+
+    def fetch_range(start: int, length: int) -> bytes:
+        response = client.get_object(bucket, object_name, offset=start, length=length)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    return RangeFile(size, fetch_range, max_workers)
+
+
+def open_local_range_file(path: str | Path, max_workers: int = 8) -> RangeFile:
+    path = Path(path)
+
+    def fetch_range(start: int, length: int) -> bytes:
+        with open(path, "rb") as f:
+            f.seek(start)
+            return f.read(length)
+
+    return RangeFile(path.stat().st_size, fetch_range, max_workers)
+
+
+def read_footer(source: RangeFile) -> pq.FileMetaData:
+    source.prefetch([(max(0, source.size - FOOTER_PREFETCH_BYTES), source.size)])
+    tail = source._read(source.size - 8, 8)
+    if tail[4:] != b"PAR1":
+        raise ValueError("Fichier Parquet invalide (magic PAR1 absent)")
+    footer_length = int.from_bytes(tail[:4], "little")
+    footer = source._read(source.size - 8 - footer_length, footer_length)
+    return pq.read_metadata(pa.BufferReader(b"PAR1" + footer + tail))
+
+
+def _row_group_may_match(row_group, column_indexes: dict, filters: list) -> bool:
+    for column, op, value in filters:
+        stats = row_group.column(column_indexes[column]).statistics
+        if stats is None or not stats.has_min_max:
+            continue
+        low, high = stats.min, stats.max
+        if op == "==" and (value < low or value > high):
+            return False
+        if op == "in" and all(v < low or v > high for v in value):
+            return False
+        if op == "<" and not low < value:
+            return False
+        if op == "<=" and not low <= value:
+            return False
+        if op == ">" and not high > value:
+            return False
+        if op == ">=" and not high >= value:
+            return False
+    return True
+
+
+def _filter_expression(filters: list):
+    expression = None
+    for column, op, value in filters:
+        field = pc.field(column)
+        condition = field.isin(value) if op == "in" else OPERATORS[op](field, value)
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def read_parquet(bucket: str, object_name: str, columns: list[str] | None = None,
+                 filters: list[tuple] | None = None, client=None, local_dir: str | Path | None = None,
+                 max_workers: int = 8) -> pa.Table:
+    """Read a Parquet object fetching only the footer and the needed column chunks.
+
+    ``filters`` is a list of ``(column, op, value)`` tuples combined with AND,
+    e.g. ``[("date_achat", ">=", "2024-01-01")]``; ``op`` is one of
+    ``== != < <= > >= in``. Row groups whose statistics exclude the predicate
+    are never fetched. With ``local_dir`` the object is read from
+    ``local_dir/bucket/object_name`` instead of MinIO.
+    """
+    filters = filters or []
+    if local_dir is not None:
+        source = open_local_range_file(Path(local_dir) / bucket / object_name, max_workers)
+    else:
+        source = open_minio_range_file(bucket, object_name, client, max_workers)
+
+    metadata = read_footer(source)
+    parquet_file = pq.ParquetFile(source, metadata=metadata)
+
+    column_indexes = {metadata.schema.column(j).path: j for j in range(metadata.num_columns)}
+    unknown = [c for c in (columns or []) + [f[0] for f in filters] if c not in column_indexes]
+    if unknown:
+        raise ValueError(f"Colonnes inconnues dans {object_name}: {unknown}")
+
+    wanted = columns or list(column_indexes)
+    needed = list(dict.fromkeys(wanted + [f[0] for f in filters]))
+
+    row_groups = [
+        i for i in range(metadata.num_row_groups)
+        if _row_group_may_match(metadata.row_group(i), column_indexes, filters)
+    ]
+
+    ranges = []
+    for i in row_groups:
+        row_group = metadata.row_group(i)
+        for column in needed:
+            chunk = row_group.column(column_indexes[column])
+            start = chunk.data_page_offset
+            if chunk.has_dictionary_page and chunk.dictionary_page_offset:
+                start = min(start, chunk.dictionary_page_offset)
+            ranges.append((start, start + chunk.total_compressed_size))
+    source.prefetch(ranges)
+
+    table = parquet_file.read_row_groups(row_groups, columns=needed, use_threads=False)
+    if filters:
+        table = table.filter(_filter_expression(filters))
+
+    print(f"Parquet {bucket}/{object_name}: {len(row_groups)}/{metadata.num_row_groups} row groups, "
+          f"{len(needed)}/{metadata.num_columns} colonnes, {source.bytes_fetched} octets lus sur {source.size} "
+          f"({source.requests} requêtes)")
+    return table.select(wanted)
+
+
+if __name__ == "__main__":
+    import argparse
+    from config import BUCKET_GOLD
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("object_name", nargs="?", default="fact_achats.parquet")
+    parser.add_argument("--bucket", default=BUCKET_GOLD)
+    parser.add_argument("--columns", help="colonnes séparées par des virgules")
+    parser.add_argument("--since", help="filtre date_achat >= AAAA-MM-JJ")
+    parser.add_argument("--local-dir")
+    args = parser.parse_args()
+
+    filters = [("date_achat", ">=", args.since)] if args.since else None
+    columns = args.columns.split(",") if args.columns else None
+    table = read_parquet(args.bucket, args.object_name, columns, filters, local_dir=args.local_dir)
+    print(table.slice(0, 10).to_pandas())
+    print(f"{table.num_rows} lignes")
@@ -8,7 +8,8 @@ sys.path.append(str(Path(__file__).parent))
 from config import get_minio_client
 
 
-def run_pipeline(generate_data: bool = False, skip_mongodb: bool = False):
+def run_pipeline(generate_data: bool = False, skip_mongodb: bool = False, workers: int = 1,
+                 partition_by: str = "month", sync_mode: str | None = None):
     try:
         get_minio_client().list_buckets()
     except Exception as e:
@@ -24,17 +25,24 @@ def run_pipeline(generate_data: bool = False, skip_mongodb: bool = False):
     from bronze import upload_data_to_bronze
     upload_data_to_bronze()
 
-    from silver import transform_clients_to_silver, transform_achats_to_silver
-    transform_clients_to_silver()
-    transform_achats_to_silver()
+    if workers > 1:
+        from parallel import transform_parallel
+        transform_parallel(workers, partition_by)
+    else:
+        from silver import transform_clients_to_silver, transform_achats_to_silver
+        transform_clients_to_silver()
+        transform_achats_to_silver()
 
-    from gold import transform_to_gold
-    transform_to_gold()
+        from gold import transform_to_gold
+        transform_to_gold()
 
     if not skip_mongodb:
         try:
             from mongodb_sync import transform_gold_to_mongodb
-            transform_gold_to_mongodb()
+            if sync_mode:
+                transform_gold_to_mongodb(sync_mode)
+            else:
+                transform_gold_to_mongodb()
         except Exception as e:
             print(f"⚠ MongoDB sync skipped: {e}")
             print("Make sure MongoDB is running: docker compose up -d")
@@ -55,6 +63,17 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--generate", action="store_true")
     parser.add_argument("--skip-mongodb", action="store_true")
+    parser.add_argument("--workers", type=int, default=1, help="silver/gold partitionnés sur N processus")
+    parser.add_argument("--partition-by", choices=["month", "client"], default="month")
+    parser.add_argument("--sync-mode", choices=["diff", "swap"],
+                        help="sync MongoDB incrémentale (diff) ou rechargement blue/green (swap)")
+    parser.add_argument("--watch", action="store_true", help="mode streaming: surveille les nouveaux fichiers d'achats")
+    parser.add_argument("--interval", type=float, default=2.0, help="intervalle des micro-batches en secondes")
+    parser.add_argument("--source-dir", help="répertoire local à surveiller au lieu du bucket sources")
     args = parser.parse_args()
-    run_pipeline(args.generate, args.skip_mongodb)
+    if args.watch:
+        from stream import run_stream
+        run_stream(args.interval, args.source_dir, args.skip_mongodb)
+    else:
+        run_pipeline(args.generate, args.skip_mongodb, args.workers, args.partition_by, args.sync_mode)
 
@@ -4,16 +4,9 @@ from io import BytesIO
 import sys
 
 sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
 from config import get_minio_client, BUCKET_BRONZE, BUCKET_SILVER
-
-
-def load_from_minio(bucket: str, object_name: str) -> pd.DataFrame:
-    client = get_minio_client()
-    response = client.get_object(bucket, object_name)
-    df = pd.read_csv(BytesIO(response.read()))
-    response.close()
-    response.release_conn()
-    return df
+from storage import load_from_minio, remove_stream_parts
 
 
 def save_to_minio(df: pd.DataFrame, bucket: str, object_name: str) -> None:
@@ -28,8 +21,7 @@ def save_to_minio(df: pd.DataFrame, bucket: str, object_name: str) -> None:
     client.put_object(bucket, object_name.replace(".csv", ".parquet"), parquet_buffer, length=len(parquet_buffer.getvalue()))
 
 
-def transform_clients_to_silver() -> pd.DataFrame:
-    df = load_from_minio(BUCKET_BRONZE, "clients.csv")
+def clean_clients(df: pd.DataFrame) -> pd.DataFrame:
     df = df.dropna(subset=["client_id"])
     df["nom"] = df["nom"].fillna("Inconnu")
     df["email"] = df["email"].fillna("non_renseigne@unknown.com")
@@ -41,13 +33,17 @@ def transform_clients_to_silver() -> pd.DataFrame:
     df["email"] = df["email"].str.strip().str.lower()
     df = df.drop_duplicates(subset=["client_id"], keep="first")
     df = df.drop_duplicates(subset=["email"], keep="first")
+    return df
+
+
+def transform_clients_to_silver() -> pd.DataFrame:
+    df = clean_clients(load_from_minio(BUCKET_BRONZE, "clients.csv", "csv"))
     save_to_minio(df, BUCKET_SILVER, "clients_silver.csv")
     print(f"Silver clients: {len(df)}")
     return df
 
 
-def transform_achats_to_silver() -> pd.DataFrame:
-    df = load_from_minio(BUCKET_BRONZE, "achats.csv")
+def clean_achats(df: pd.DataFrame) -> pd.DataFrame:
     df = df.dropna(subset=["achat_id", "client_id", "montant_total"])
     df = df[df["montant_total"] > 0]
     df = df[df["quantite"] > 0]
@@ -57,7 +53,23 @@ def transform_achats_to_silver() -> pd.DataFrame:
     df["statut"] = df["statut"].str.strip().str.lower()
     df["mode_paiement"] = df["mode_paiement"].str.strip().str.lower()
     df = df.drop_duplicates(subset=["achat_id"], keep="first")
+    return df
+
+
+def load_raw_achats() -> pd.DataFrame:
+    """Bronze achats: the batch extract, then the files received by the stream (``incoming/``)."""
+    frames = [load_from_minio(BUCKET_BRONZE, "achats.csv", "csv")]
+    for obj in get_minio_client().list_objects(BUCKET_BRONZE, prefix="incoming/", recursive=True):
+        if obj.object_name.endswith(".csv"):
+            frames.append(load_from_minio(BUCKET_BRONZE, obj.object_name, "csv"))
+    return pd.concat(frames, ignore_index=True)
+
+
+def transform_achats_to_silver() -> pd.DataFrame:
+    df = clean_achats(load_raw_achats())
     save_to_minio(df, BUCKET_SILVER, "achats_silver.csv")
+    # Their rows are now in achats_silver
+    remove_stream_parts(BUCKET_SILVER, "achats_silver.parquet")
     print(f"Silver achats: {len(df)}")
     return df
 
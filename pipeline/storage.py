@@ -0,0 +1,124 @@
+import os
+import sys
+import hashlib
+import threading
+from pathlib import Path
+
+import pandas as pd
+from minio.error import S3Error
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config import get_minio_client, MINIO_CACHE_DIR, MINIO_CACHE_MAX_BYTES
+
+# Prefix of the micro-batch parts the stream appends next to a table: achats_silver/stream/...
+STREAM_PARTS = "stream"
+
+READERS = {
+    "csv": pd.read_csv,
+    "parquet": pd.read_parquet,
+}
+
+
+def _cache_key(bucket: str, object_name: str) -> str:
+    return hashlib.sha1(f"{bucket}/{object_name}".encode()).hexdigest()
+
+
+def _cache_path(bucket: str, object_name: str, etag: str) -> Path:
+    return MINIO_CACHE_DIR / f"{_cache_key(bucket, object_name)}-{etag}"
+
+
+def _evict(keep: Path, max_bytes: int = MINIO_CACHE_MAX_BYTES) -> None:
+    """Delete the least recently used copies until the cache fits in ``max_bytes``, never ``keep``.
+
+    ``keep`` is the object just fetched: it is about to be read, even if it alone exceeds the limit.
+    """
+    entries = []
+    for p in MINIO_CACHE_DIR.iterdir():
+        if p.name.endswith(".part"):
+            continue
+        try:
+            entries.append((p, p.stat()))
+        except FileNotFoundError:
+            # Removed by a concurrent fetch
+            continue
+    total = sum(stat.st_size for _, stat in entries)
+    for path, stat in sorted(entries, key=lambda entry: entry[1].st_mtime):
+        if total <= max_bytes:
+            break
+        if path != keep:
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+
+
+def fetch_object(bucket: str, object_name: str, client=None) -> Path:
+    """Return a local copy of an object, downloading it only if its ETag changed."""
+    client = client or get_minio_client()
+    MINIO_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    etag = client.stat_object(bucket, object_name).etag.strip('"')
+    path = _cache_path(bucket, object_name, etag)
+    if path.exists():
+        os.utime(path)
+        return path
+
+    # One temporary file per download, so concurrent fetches of the same object don't clobber each other
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}-{threading.get_ident()}.part")
+    response = client.get_object(bucket, object_name, request_headers={"If-Match": f'"{etag}"'})
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in response.stream(1024 * 1024):
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    finally:
+        response.close()
+        response.release_conn()
+        tmp_path.unlink(missing_ok=True)
+
+    # Copies of older versions only: never the current one, which a concurrent fetch may be reading
+    for stale in MINIO_CACHE_DIR.glob(f"{_cache_key(bucket, object_name)}-*"):
+        if stale != path and not stale.name.endswith(".part"):
+            stale.unlink(missing_ok=True)
+
+    _evict(keep=path)
+    return path
+
+
+def load_from_minio(bucket: str, object_name: str, file_format: str, **kwargs) -> pd.DataFrame:
+    if file_format not in READERS:
+        raise ValueError(f"Format non supporté: {file_format} (attendu: {', '.join(READERS)})")
+    try:
+        path = fetch_object(bucket, object_name)
+    except S3Error as e:
+        if e.code != "PreconditionFailed":
+            raise
+        path = fetch_object(bucket, object_name)
+    try:
+        return READERS[file_format](path, **kwargs)
+    except FileNotFoundError:
+        # Evicted by a concurrent fetch between download and read
+        return READERS[file_format](fetch_object(bucket, object_name), **kwargs)
+
+
+def stream_parts(bucket: str, object_name: str, client=None) -> list:
+    """Parquet parts appended to ``object_name`` by the stream since the table was last rewritten, oldest first."""
+    client = client or get_minio_client()
+    prefix = f"{object_name.rsplit('.', 1)[0]}/{STREAM_PARTS}/"
+    parts = [obj for obj in client.list_objects(bucket, prefix=prefix, recursive=True)
+             if obj.object_name.endswith(".parquet")]
+    return sorted(parts, key=lambda obj: obj.object_name)
+
+
+def remove_stream_parts(bucket: str, object_name: str, client=None) -> int:
+    """Delete the parts (csv and parquet) of a table that was rewritten with their rows."""
+    client = client or get_minio_client()
+    prefix = f"{object_name.rsplit('.', 1)[0]}/{STREAM_PARTS}/"
+    names = [obj.object_name for obj in client.list_objects(bucket, prefix=prefix, recursive=True)]
+    for name in names:
+        client.remove_object(bucket, name)
+    return len(names)
+
+
+def clear_cache() -> None:
+    if MINIO_CACHE_DIR.exists():
+        for path in MINIO_CACHE_DIR.iterdir():
+            path.unlink(missing_ok=True)
@@ -0,0 +1,243 @@
+import sys
+import json
+import time
+from pathlib import Path
+from io import BytesIO
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+from config import (
+    get_minio_client, BUCKET_SOURCES, BUCKET_BRONZE, BUCKET_SILVER, BUCKET_GOLD,
+    get_mongodb_client, get_mongodb_database, create_indexes, log_sync,
+    COLLECTION_ACHATS, COLLECTION_KPI, COLLECTION_DIM_PRODUITS, GOLD_AGGREGATES
+)
+from storage import load_from_minio, stream_parts, STREAM_PARTS
+from silver import save_to_minio, clean_achats
+from gold import build_dimensions, save_to_minio as save_gold_to_minio
+from parallel import partial_aggregates, collapse_partials, merge_aggregates
+from mongodb_sync import load_to_mongodb, iter_frame, build_client_views, full_views_rebuild, stamp_kpi
+
+STATE_PATH = Path(__file__).parent.parent / "data" / "stream_state.json"
+
+
+def load_state() -> dict:
+    if STATE_PATH.exists():
+        return json.loads(STATE_PATH.read_text())
+    return {}
+
+
+def save_state(state: dict) -> None:
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    STATE_PATH.write_text(json.dumps(state, indent=2))
+
+
+def poll_minio_sources(client, seen: dict) -> list[dict]:
+    new_files = []
+    for obj in client.list_objects(BUCKET_SOURCES, recursive=True):
+        if not obj.object_name.endswith(".csv") or seen.get(obj.object_name) == obj.etag:
+            continue
+        new_files.append({
+            "name": obj.object_name,
+            "version": obj.etag,
+            "arrived_at": obj.last_modified.timestamp(),
+        })
+    return new_files
+
+
+def poll_local_sources(source_dir: Path, seen: dict) -> list[dict]:
+    new_files = []
+    for path in sorted(source_dir.glob("*.csv")):
+        stat = path.stat()
+        version = f"{stat.st_mtime_ns}-{stat.st_size}"
+        if seen.get(path.name) == version:
+            continue
+        new_files.append({"name": path.name, "version": version, "arrived_at": stat.st_mtime, "path": path})
+    return new_files
+
+
+def read_source(client, source: dict) -> bytes:
+    if "path" in source:
+        return source["path"].read_bytes()
+    response = client.get_object(BUCKET_SOURCES, source["name"])
+    try:
+        return response.read()
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def load_silver_or_empty(object_name: str) -> pd.DataFrame:
+    """A silver table followed by the stream parts appended to it, empty if it was never written."""
+    try:
+        names = [object_name] + [obj.object_name for obj in stream_parts(BUCKET_SILVER, object_name)]
+        return pd.concat([load_from_minio(BUCKET_SILVER, name, "parquet") for name in names], ignore_index=True)
+    except Exception:
+        return pd.DataFrame()
+
+
+def init_gold_state(df_clients: pd.DataFrame, df_achats: pd.DataFrame) -> dict:
+    """Running state the micro-batches are folded into, read once from the silver history.
+
+    ``partials`` has the shape of ``parallel.partial_aggregates``: merging it gives the gold aggregates.
+    """
+    if df_achats.empty:
+        df_achats = pd.DataFrame(columns=["achat_id", "client_id", "produit", "categorie", "quantite",
+                                          "montant_total", "date_achat", "statut", "mode_paiement"])
+    dimensions = build_dimensions(df_clients, df_achats)
+    client_pays = df_clients[["client_id", "pays"]]
+    return {
+        "client_pays": client_pays,
+        "client_pays_id": dimensions["dim_clients"][["client_id", "pays_id"]],
+        "dim_produits": dimensions["dim_produits"],
+        "achat_ids": set(df_achats["achat_id"].tolist()),
+        "rows": len(df_achats),
+        "partials": partial_aggregates(df_achats.assign(_row=range(len(df_achats))), client_pays),
+    }
+
+
+def fold_batch(df_clients: pd.DataFrame, gold: dict, df_batch: pd.DataFrame) -> tuple[pd.DataFrame, dict, dict]:
+    """Fact rows of a micro-batch, the gold tables it changes, and the state with the batch folded in.
+
+    Same tables as ``build_gold_tables`` over the whole history, for a cost that follows the batch.
+    ``gold`` itself is left as is, so a failed batch is retried from it.
+    """
+    # New products get the next ids, as build_dimensions numbers them in order of first appearance
+    dim_produits = pd.concat([gold["dim_produits"][["produit", "categorie"]], df_batch[["produit", "categorie"]]])
+    dim_produits = dim_produits.drop_duplicates().reset_index(drop=True)
+    dim_produits["produit_id"] = dim_produits.index + 1
+
+    fact = df_batch.merge(dim_produits[["produit_id", "produit"]], on="produit", how="left")
+    fact = fact.merge(gold["client_pays_id"], on="client_id", how="left")
+    fact = fact.sort_values("date_achat", kind="stable").reset_index(drop=True)
+
+    batch = df_batch.assign(_row=range(gold["rows"], gold["rows"] + len(df_batch)))
+    partials = {name: [partial] for name, partial in gold["partials"].items()}
+    for name, partial in partial_aggregates(batch, gold["client_pays"]).items():
+        partials[name].append(partial)
+    folded = {**gold, "dim_produits": dim_produits, "rows": gold["rows"] + len(df_batch),
+              "partials": collapse_partials(partials)}
+
+    tables = merge_aggregates(df_clients, {name: [partial] for name, partial in folded["partials"].items()})
+    tables["dim_produits"] = dim_produits
+    return fact, tables, folded
+
+
+def write_batch_to_mongodb(db, new_rows: pd.DataFrame, tables: dict) -> None:
+    """Upsert the new achats and the gold tables they change, with the row hashes of the diff sync.
+
+    The next diff sync then skips these documents, and a batch retried after a partial write
+    updates the achats already there instead of duplicating them.
+    """
+    if not new_rows.empty:
+        # New products must be resolvable before their achats are read back in compact schema
+        load_to_mongodb(db, COLLECTION_DIM_PRODUITS, iter_frame(tables["dim_produits"]), "produit_id")
+        load_to_mongodb(db, COLLECTION_ACHATS, iter_frame(new_rows), "achat_id", delete_missing=False)
+    stamp_kpi(db, load_to_mongodb(db, COLLECTION_KPI, iter_frame(tables["kpi_global"]), "scope",
+                                  extra_columns={"scope": "global"}))
+
+    # Derived collections read by the API: gold aggregates (agg_par_jour...) and client views
+    for name, spec in GOLD_AGGREGATES.items():
+        load_to_mongodb(db, name, iter_frame(tables[name]), spec["key"])
+    if not new_rows.empty:
+        client_ids = set(new_rows["client_id"].tolist())
+        build_client_views(db, None if full_views_rebuild(db, client_ids) else client_ids)
+
+
+def process_micro_batch(client, db, sources: list[dict], df_clients: pd.DataFrame, gold: dict) -> tuple[float, dict]:
+    start_time = time.time()
+
+    raw_frames = []
+    for source in sources:
+        data = read_source(client, source)
+        client.put_object(BUCKET_BRONZE, f"incoming/{Path(source['name']).name}", BytesIO(data),
+                          length=len(data), content_type="text/csv")
+        raw_frames.append(pd.read_csv(BytesIO(data)))
+
+    df_batch = clean_achats(pd.concat(raw_frames, ignore_index=True))
+    df_batch = df_batch[~df_batch["achat_id"].isin(gold["achat_ids"])].reset_index(drop=True)
+    new_rows, tables, folded = fold_batch(df_clients, gold, df_batch)
+
+    # Only the new rows are appended to silver and fact_achats; the small gold tables are rewritten
+    part = f"{STREAM_PARTS}/{time.time_ns():020d}.csv"
+    parts = [(BUCKET_SILVER, f"achats_silver/{part}"), (BUCKET_GOLD, f"fact_achats/{part}")]
+    try:
+        if not df_batch.empty:
+            save_to_minio(df_batch, BUCKET_SILVER, parts[0][1])
+            save_gold_to_minio(new_rows, parts[1][1])
+        for name, df in tables.items():
+            save_gold_to_minio(df, f"{name}.csv")
+        if db is not None:
+            write_batch_to_mongodb(db, new_rows, tables)
+    except Exception:
+        # The batch is retried whole: its rows must not be appended twice
+        for bucket, name in parts:
+            for object_name in (name, name.replace(".csv", ".parquet")):
+                client.remove_object(bucket, object_name)
+        raise
+    folded["achat_ids"].update(df_batch["achat_id"].tolist())
+
+    latency = time.time() - min(source["arrived_at"] for source in sources)
+    duration = time.time() - start_time
+    if db is not None:
+        log_sync(db, "stream", "success", len(df_batch), duration,
+                 files=[source["name"] for source in sources], latency_seconds=round(latency, 3))
+
+    print(f"✓ Micro-batch: {len(sources)} fichier(s), {len(df_batch)} achats, "
+          f"traitement {duration:.2f}s, latence bout-en-bout {latency:.2f}s")
+    return latency, folded
+
+
+def run_stream(interval: float = 2.0, source_dir: str | None = None, skip_mongodb: bool = False,
+               max_batches: int | None = None) -> None:
+    print("=" * 60)
+    print(f"STREAMING MICRO-BATCH ({source_dir or f'bucket {BUCKET_SOURCES}'}, intervalle {interval}s)")
+    print("=" * 60)
+
+    client = get_minio_client()
+    if source_dir is None and not client.bucket_exists(BUCKET_SOURCES):
+        client.make_bucket(BUCKET_SOURCES)
+    for bucket in (BUCKET_BRONZE, BUCKET_SILVER, BUCKET_GOLD):
+        if not client.bucket_exists(bucket):
+            client.make_bucket(bucket)
+
+    db = None
+    if not skip_mongodb:
+        db = get_mongodb_database(get_mongodb_client())
+        create_indexes(db)
+
+    df_clients = load_silver_or_empty("clients_silver.parquet")
+    if df_clients.empty:
+        print("⚠ Aucun client en silver: lancez d'abord le pipeline batch")
+        return
+    gold = init_gold_state(df_clients, load_silver_or_empty("achats_silver.parquet"))
+
+    state = load_state()
+    latencies = []
+    batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            tick = time.time()
+            if source_dir:
+                sources = poll_local_sources(Path(source_dir), state)
+            else:
+                sources = poll_minio_sources(client, state)
+
+            if sources:
+                try:
+                    latency, gold = process_micro_batch(client, db, sources, df_clients, gold)
+                    latencies.append(latency)
+                    for source in sources:
+                        state[source["name"]] = source["version"]
+                    save_state(state)
+                except Exception as e:
+                    print(f"✗ Micro-batch en échec ({[s['name'] for s in sources]}): {e}")
+                batches += 1
+
+            time.sleep(max(0.0, interval - (time.time() - tick)))
+    except KeyboardInterrupt:
+        print("\nArrêt du streaming")
+
+    if latencies:
+        print(f"Latence moyenne: {sum(latencies) / len(latencies):.2f}s, max: {max(latencies):.2f}s")
@@ -0,0 +1,53 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent / "api"))
+mongomock = pytest.importorskip("mongomock")
+import app as flask_api
+
+
+class UnreachableDatabase:
+    def command(self, name):
+        raise ConnectionError("no MongoDB")
+
+
+class AsyncDatabase:
+    """Async facade over a mongomock database, enough for the ASGI health check."""
+
+    def __init__(self, database):
+        self.database = database
+
+    async def command(self, name):
+        return self.database.command(name)
+
+
+@pytest.fixture
+def database():
+    return mongomock.MongoClient()["analytics"]
+
+
+def test_flask_health_with_reachable_database(monkeypatch, database):
+    monkeypatch.setattr(flask_api, "db", database)
+    response = flask_api.app.test_client().get("/api/health")
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "healthy"
+
+
+def test_flask_health_without_database(monkeypatch):
+    monkeypatch.setattr(flask_api, "db", UnreachableDatabase())
+    response = flask_api.app.test_client().get("/api/health")
+    assert response.status_code == 503
+    assert response.get_json() == {"status": "unhealthy"}
+
+
+def test_asgi_health_with_reachable_database(monkeypatch, database):
+    # Needs pymongo>=4.9 (AsyncMongoClient) or motor
+    asgi = pytest.importorskip("asgi", exc_type=ImportError)
+    from starlette.testclient import TestClient
+
+    monkeypatch.setattr(asgi, "get_async_database", lambda: AsyncDatabase(database))
+    response = TestClient(asgi.app).get("/api/health")
+    assert response.status_code == 200
+    assert response.json()["status"] == "healthy"
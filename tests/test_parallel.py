@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent / "pipeline"))
+from generate import generate_clients, generate_achats
+from silver import clean_clients, clean_achats
+from gold import build_gold_tables
+from parallel import process_parallel
+
+
+def test_parallel_matches_single_process_with_null_dates(tmp_path):
+    client_ids = generate_clients(50, str(tmp_path / "clients.csv"))
+    generate_achats(client_ids, 500, str(tmp_path / "achats.csv"))
+    df_clients = clean_clients(pd.read_csv(tmp_path / "clients.csv"))
+    df_raw = pd.read_csv(tmp_path / "achats.csv")
+    # Silver coerces unparsable dates to null
+    delivered = df_raw.index[df_raw["statut"] == "livré"]
+    df_raw.loc[delivered[:2], "date_achat"] = "pas une date"
+
+    reference_achats = clean_achats(df_raw.copy())
+    assert reference_achats["date_achat"].isna().sum() == 2
+    reference = build_gold_tables(df_clients, reference_achats)
+    df_achats, tables = process_parallel(df_clients, df_raw, workers=2)
+
+    pd.testing.assert_frame_equal(df_achats, reference_achats.reset_index(drop=True))
+    for name in reference:
+        pd.testing.assert_frame_equal(tables[name].reset_index(drop=True), reference[name].reset_index(drop=True),
+                                      obj=name)
+    assert tables["agg_par_annee"]["annee"].dtype.kind == "i"